@@ -1,19 +1,23 @@
 import base64
 import streamlit as st
 import pandas as pd
-import requests
-from bs4 import BeautifulSoup
+import numpy as np
 import time
-import re
-import json
-import random
-import queue
-
-# Clear cache and session state to avoid rendering issues
-if 'processed_data' in st.session_state:
-    # Don't delete the data, we'll use it if it exists
-    pass
-st.cache_data.clear()
+import uuid
+
+from fetcher import DEFAULT_CONCURRENCY, MAX_CONCURRENCY
+from job_store import JOB_COMPLETE
+from job_runner import JOB_FAILED, get_default_job_registry
+from fetch_metrics import get_default_fetch_metrics, start_metrics_server
+from single_flight import get_default_single_flight
+from thumbnails import get_default_thumbnail_pipeline
+from virtual_grid import render_virtual_grid
+from grid_pages import GRID_PAGE_SIZE, get_default_grid_page_cache, page_count, page_signature, page_slice
+from grid_tiles import get_default_tile_cache
+from prices import numeric_prices
+from search_index import get_search_index
+from dataset_store import get_default_dataset_store
+from compact_data import compact_dataframe
 
 # Set page configuration
 st.set_page_config(
@@ -26,6 +30,9 @@ st.set_page_config(
 
 
 
+# Serve fetch timings for Prometheus; only the first script run binds the port
+start_metrics_server()
+
 # Initialize session state for authentication
 if 'authenticated' not in st.session_state:
     st.session_state.authenticated = False
@@ -33,6 +40,8 @@ if 'fullscreen_mode' not in st.session_state:
     st.session_state.fullscreen_mode = False
 if 'processed_data' not in st.session_state:
     st.session_state.processed_data = None
+if 'memory_report' not in st.session_state:
+    st.session_state.memory_report = None
 if 'failed_asins' not in st.session_state:
     st.session_state.failed_asins = []
 if 'logs' not in st.session_state:
@@ -43,6 +52,14 @@ if 'current_processing_id' not in st.session_state:
     st.session_state.current_processing_id = 0
 if 'total_processing_count' not in st.session_state:
     st.session_state.total_processing_count = 0
+if 'active_job_id' not in st.session_state:
+    st.session_state.active_job_id = None
+if 'loaded_job_id' not in st.session_state:
+    st.session_state.loaded_job_id = None
+# Identifies this browser session to the job registry, so the job panel only
+# lists the jobs started here
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
 
 # Custom CSS including password screen styling
 def add_custom_css():
@@ -608,10 +625,10 @@ def add_log(message, level="info"):
     log_entry = (level, f"[{timestamp}] {message}")
     st.session_state.logs.append(log_entry)
 
-def display_logs(log_container):
+def display_logs(log_container, logs=None):
     log_display = '<div class="log-container">\n'
     
-    for entry in st.session_state.logs:
+    for entry in (st.session_state.logs if logs is None else logs):
         try:
             if isinstance(entry, tuple) and len(entry) == 2:
                 level, message = entry
@@ -624,185 +641,11 @@ def display_logs(log_container):
     log_display += '</div>'
     log_container.markdown(log_display, unsafe_allow_html=True)
 
-# Function to create a session with proper headers
-def create_session():
-    user_agents = [
-        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36",
-        "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/115.0",
-        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36 Edg/120.0.0.0",
-        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Safari/605.1.15"
-    ]
-    
-    headers = {
-        "User-Agent": random.choice(user_agents),
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-        "Accept-Language": "en-US,en;q=0.5",
-        "Accept-Encoding": "gzip, deflate, br",
-        "Connection": "keep-alive",
-        "Upgrade-Insecure-Requests": "1",
-        "Sec-Fetch-Dest": "document",
-        "Sec-Fetch-Mode": "navigate",
-        "Sec-Fetch-Site": "none",
-        "Sec-Fetch-User": "?1",
-        "Cache-Control": "max-age=0",
-        "Referer": "https://www.google.com/"
-    }
-    
-    session = requests.Session()
-    session.headers.update(headers)
-    
-    cookies = {
-        "session-id": f"{random.randint(100000000, 999999999)}",
-        "session-id-time": f"{int(time.time())}",
-        "i18n-prefs": "USD",
-        "sp-cdn": f"L5Z9:{random.randint(100000, 999999)}"
-    }
-    
-    for key, value in cookies.items():
-        session.cookies.set(key, value)
-        
-    return session
-
-# Function to get Amazon product details
-def get_amazon_product_details(asin, log_queue, processing_id, total_count):
-    st.session_state.current_processing_id = processing_id
-    st.session_state.total_processing_count = total_count
-    
-    log_queue.put(('info', f'Starting to process ASIN: {asin} ({processing_id}/{total_count})'))
-    
-    product_details = {
-        'asin': asin,
-        'title': 'Product information not available',
-        'price': 'N/A',
-        'image_url': '',
-        'success': False,
-        'retry_count': 0,
-        'error': None
-    }
-
-    for attempt in range(3):
-        session = create_session()
-        url = f"https://www.amazon.com/dp/{asin}"
-        
-        log_queue.put(('info', f'ASIN {asin}: Attempt {attempt+1}/3 started'))
-        
-        if attempt > 0:
-            sleep_time = 2 + random.uniform(1, 3)
-            log_queue.put(('info', f'ASIN {asin}: Waiting {sleep_time:.2f} seconds before retry'))
-            time.sleep(sleep_time)
-        
-        try:
-            response = session.get(url, timeout=15)
-            
-            if response.status_code == 200:
-                log_queue.put(('success', f'ASIN {asin}: Retrieved page on attempt {attempt+1}'))
-                
-                soup = BeautifulSoup(response.text, 'html.parser')
-                
-                title_element = soup.select_one('#productTitle')
-                if title_element:
-                    product_details['title'] = title_element.get_text().strip()
-                    log_queue.put(('info', f'ASIN {asin}: Found title: {product_details["title"][:30]}...'))
-                
-                price_selectors = [
-                    '.a-price .a-offscreen',
-                    '#priceblock_ourprice',
-                    '#priceblock_dealprice',
-                    '.a-color-price',
-                    '#price_inside_buybox',
-                    '.priceToPay span.a-offscreen'
-                ]
-                
-                for selector in price_selectors:
-                    price_element = soup.select_one(selector)
-                    if price_element and price_element.get_text().strip():
-                        product_details['price'] = price_element.get_text().strip()
-                        log_queue.put(('info', f'ASIN {asin}: Found price: {product_details["price"]}'))
-                        break
-                
-                image_found = False
-                image_selectors = [
-                    '#landingImage',
-                    '#imgBlkFront',
-                    '#ebooksImgBlkFront',
-                    '#img-wrapper img',
-                    '.a-dynamic-image',
-                    '#main-image',
-                    'img[data-old-hires]',
-                    'img[data-a-dynamic-image]',
-                    '.imageThumb img',
-                    '#imageBlock img',
-                    '#imgTagWrapperId img',
-                    '.image-wrapper img',
-                    'img.a-dynamic-image'
-                ]
-                
-                for selector in image_selectors:
-                    image_elements = soup.select(selector)
-                    
-                    for image_element in image_elements:
-                        for attr in ['src', 'data-old-hires', 'data-a-dynamic-image']:
-                            if image_element.get(attr):
-                                image_url = image_element.get(attr)
-                                
-                                if image_url and image_url.startswith('{'):
-                                    try:
-                                        image_data = json.loads(image_url)
-                                        if image_data:
-                                            image_url = max(image_data.keys(), key=lambda x: image_data[x][0] * image_data[x][1])
-                                    except:
-                                        image_url = image_element.get('src', '')
-                                
-                                if image_url:
-                                    try:
-                                        if '._' in image_url:
-                                            base_image_url = image_url.split('._')[0]
-                                            image_url = base_image_url + "._AC_SL1500_.jpg"
-                                        
-                                        product_details['image_url'] = image_url
-                                        log_queue.put(('success', f'ASIN {asin}: Found image on attempt {attempt+1}'))
-                                        image_found = True
-                                        break
-                                        
-                                    except Exception as img_error:
-                                        log_queue.put(('warning', f'ASIN {asin}: Error processing image URL: {str(img_error)}'))
-                                        product_details['image_url'] = image_url
-                                        image_found = True
-                                        break
-                            
-                        if image_found:
-                            break
-                    
-                    if image_found:
-                        break
-                
-                if not image_found:
-                    log_queue.put(('warning', f'ASIN {asin}: No image found on attempt {attempt+1}. Will retry.'))
-                    continue
-                
-                if product_details['title'] != 'Product information not available' and image_found:
-                    product_details['success'] = True
-                    log_queue.put(('success', f'ASIN {asin}: Successfully found title, price and image!'))
-                    return product_details
-            
-            else:
-                log_queue.put(('error', f'ASIN {asin}: Bad status code {response.status_code} on attempt {attempt+1}'))
-        
-        except Exception as e:
-            log_queue.put(('error', f'ASIN {asin}: Error on attempt {attempt+1}: {str(e)}'))
-    
-    if not product_details['success']:
-        log_queue.put(('error', f'ASIN {asin}: Failed after 3 attempts'))
-        product_details['error'] = 'Failed to retrieve product data after 3 attempts'
-    
-    return product_details
-
 # Function to detect CSV type and process accordingly
 # Just replace this one function in your code:
 
 def detect_csv_type(df):
-    df_clean = df.dropna(how='all').copy()
+    df_clean = df.dropna(how='all')
     
     if df_clean.empty:
         return 'unknown'
@@ -1039,24 +882,22 @@ def process_excel_format_data(df, max_rows=None):
     return enriched_df
 
 # Function to process CSV data
+# Amazon uploads go through start_amazon_job instead, which runs in the background
 def process_csv_data(df, max_rows=None):
     csv_type = detect_csv_type(df)
     
-    if csv_type == 'amazon':
-        if not any(col.lower() in ['asin', 'sku'] for col in df.columns):
-            st.error("The CSV file must contain an 'Asin' column for Amazonr products.")
-            return None
-        return process_amazon_data(df, max_rows)
-    elif csv_type == 'excel_format':
+    if csv_type == 'excel_format':
         return process_excel_format_data(df, max_rows)
     elif csv_type == 'direct_urls':
         return process_direct_urls_data(df, max_rows)
     else:
-        st.error("Could not detect CSV format. Please ensure your file contains either 'Asin' column for Amazon products, 'Listing ID' and 'url' columns for Excel format, or direct image URLs.")
+        st.error("Could not detect CSV format. Please ensure your file contains 'Listing ID' and 'url' columns for Excel format, or direct image URLs.")
         return None
 
-# Function to process Amazon data
-def process_amazon_data(df, max_rows=None):
+# Function to start an Amazon enrichment job for an uploaded DataFrame.
+# The fetching runs in the background on the job registry, so this returns
+# straight away with the job; render_job_panel shows its progress.
+def start_amazon_job(df, max_rows=None, concurrency=DEFAULT_CONCURRENCY, use_cache=True, workers=0):
     if max_rows is not None and max_rows > 0 and max_rows < len(df):
         df = df.head(max_rows)
     
@@ -1075,150 +916,354 @@ def process_amazon_data(df, max_rows=None):
     df_copy = df.copy()
     df_copy = df_copy.rename(columns={asin_col: 'Asin'})
     
-    st.session_state.logs = []
-    st.session_state.failed_asins = []
-    st.session_state.processing_complete = False
-    st.session_state.current_processing_id = 0
-    st.session_state.total_processing_count = 0
-    
-    progress_bar = st.progress(0)
-    status_text = st.empty()
-    processing_status = st.empty()
-    log_expander = st.expander("Processing Log (Live)", expanded=True)
-    log_container = log_expander.empty()
-    
-    log_container.markdown('<div class="log-container">', unsafe_allow_html=True)
-    
-    unique_asins = df_copy['Asin'].unique()
-    total_asins = len(unique_asins)
-    
-    status_text.text(f"Processing {total_asins} unique Amazon products...")
-    add_log(f"Starting processing of {total_asins} unique ASINs from column '{asin_col}'")
-    
-    log_queue = queue.Queue()
-    
-    def process_log_queue(log_queue):
-        while not log_queue.empty():
-            try:
-                item = log_queue.get()
-                
-                if isinstance(item, tuple) and len(item) == 2:
-                    level, message = item
-                    st.session_state.logs.append((level, message))
-                else:
-                    st.session_state.logs.append(("error", f"Malformed log entry: {str(item)}"))
-            except Exception as e:
-                st.session_state.logs.append(("error", f"Error processing log entry: {str(e)}"))
-    
-    def process_batch(asins, start_index):
-        product_details_dict = {}
-        batch_log_queue = queue.Queue()
-        
-        for i, asin in enumerate(asins):
-            processing_id = start_index + i + 1
-            product_details = get_amazon_product_details(asin, batch_log_queue, processing_id, total_asins)
-            product_details_dict[asin] = product_details
-            
-            if not product_details['success'] or not product_details['image_url']:
-                st.session_state.failed_asins.append(asin)
-        
-        while not batch_log_queue.empty():
-            log_queue.put(batch_log_queue.get())
-        
-        process_log_queue(batch_log_queue)
-        
-        return product_details_dict
+    job = get_default_job_registry().submit(df_copy, concurrency, use_cache, workers, st.session_state.session_id)
+    st.session_state.active_job_id = job.job_id
+    # The job ID comes from the ASINs, so reprocessing the same file gives the
+    # same ID; forget what was loaded so the new results replace whatever the
+    # grid shows now (say an Excel file loaded since)
+    st.session_state.loaded_job_id = None
+    return job
+
+# Function to put newly processed data in the session. It's converted to the
+# compact columnar schema first, then stored under its content version
+# straight away, so the grids' memoized views are keyed without hashing the
+# data on the first grid rerun.
+def set_processed_data(df):
+    if df is not None:
+        df, st.session_state.memory_report = compact_dataframe(df)
+        get_default_dataset_store().put(df)
+    else:
+        st.session_state.memory_report = None
+    st.session_state.processed_data = df
+
+# Function to show how much memory the processed data takes
+def render_memory_report():
+    report = st.session_state.memory_report
+    if not report or not report['rows']:
+        return
+    st.caption(
+        f"In memory: {report['bytes_after'] / 1024:,.0f} KiB, {report['bytes_per_row_after']:,.0f} bytes/row "
+        f"(down from {report['bytes_per_row_before']:,.0f} bytes/row; {len(report['constant_columns'])} constant columns stored once)"
+    )
+
+# Function to load a finished job's results into the session so the grid tabs
+# pick them up
+def load_job_results(job, partial=False):
+    if partial:
+        set_processed_data(job.partial_dataframe())
+    else:
+        set_processed_data(job.result)
+        st.session_state.failed_asins = list(job.failed_asins)
+        st.session_state.processing_complete = True
+        st.session_state.loaded_job_id = job.job_id
+    st.session_state.logs = job.get_logs()
+
+# Function to show the status of the active enrichment job. It only reads the
+# job, so it can be rerun every second as a fragment without blocking the
+# rest of the page.
+def render_job_status(job_id):
+    job = get_default_job_registry().get(job_id)
+    if job is None:
+        return
     
-    batch_size = 1
-    all_product_details = {}
+    completed_count = job.completed_count
+    progress = completed_count / job.total if job.total else 1.0
+    st.progress(progress)
+    st.text(f"Job {job.job_id}: {job.status} - processed {completed_count} of {job.total} products ({int(progress*100)}%)")
     
-    for i in range(0, len(unique_asins), batch_size):
-        batch_asins = unique_asins[i:i+batch_size]
-        
-        progress = i / len(unique_asins)
-        progress_bar.progress(progress)
-        status_text.text(f"Processing batch {i//batch_size + 1} of {(len(unique_asins) + batch_size - 1) // batch_size}")
-        
-        processing_status.markdown(f"""
+    if not job.done:
+        rate = f"{job.rate:.2f}" if job.rate is not None else "-"
+        st.markdown(f"""
         <div class="processing-indicator">
-            Processing ID: <span class="processing-id">{i+1}</span> / <span class="processing-total">{len(unique_asins)}</span>
+            Processing ID: <span class="processing-id">{job.current_processing_id}</span> / <span class="processing-total">{job.fetch_total}</span>
+            &middot; Rate: <span class="processing-id">{rate}</span> req/s
         </div>
         """, unsafe_allow_html=True)
         
-        batch_results = process_batch(batch_asins, i)
-        all_product_details.update(batch_results)
-        
-        while not log_queue.empty():
-            level, message = log_queue.get()
-            st.session_state.logs.append((level, message))
-        
-        log_display = '<div class="log-container">\n'
-        for level, message in st.session_state.logs:
-            log_display += f'<div class="log-{level}">{message}</div>\n'
-        log_display += '</div>'
-        log_container.markdown(log_display, unsafe_allow_html=True)
-        
-        progress = (i + len(batch_asins)) / len(unique_asins)
-        progress_bar.progress(progress)
-        status_text.text(f"Processed {i + len(batch_asins)} of {len(unique_asins)} products ({int(progress*100)}%)")
-        
-        time.sleep(0.1)
+        if st.button("Show partial results in grid", key=f"partial_results_{job.job_id}"):
+            load_job_results(job, partial=True)
+            st.rerun(scope="app")
     
-    enriched_data = []
+    log_expander = st.expander("Processing Log (Live)", expanded=not job.done)
+    display_logs(log_expander.empty(), job.get_logs())
     
-    for _, row in df_copy.iterrows():
-        asin = row['Asin']
-        product_info = all_product_details.get(asin, {
-            'asin': asin,
-            'title': 'Product information not available',
-            'price': 'N/A',
-            'image_url': '',
-            'success': False,
-            'error': 'Processing skipped'
-        })
+    if job.status == JOB_COMPLETE:
+        if st.session_state.loaded_job_id != job.job_id:
+            load_job_results(job)
+            st.rerun(scope="app")
         
-        new_row = row.to_dict()
-        new_row.update({
-            'Product_Title': product_info['title'],
-            'Product_Price': product_info['price'],
-            'Product_Image_URL': product_info['image_url'],
-            'Product_Description': 'N/A',
-            'Product_Rating': 'N/A',
-            'Fetch_Success': product_info['success'],
-            'Product_Link': f"https://www.amazon.com/dp/{asin}",
-            'Error': product_info.get('error', None)
-        })
+        st.success("Amazon data processed successfully! Switch to Amazon Grid Images tab to view results.")
         
-        enriched_data.append(new_row)
-    
-    enriched_df = pd.DataFrame(enriched_data)
-    
-    st.session_state.processing_complete = True
-    
-    progress_bar.progress(1.0)
-    status_text.empty()
-    processing_status.empty()
+        if job.failed_asins:
+            failed_items = ''.join(f'<span class="failed-asin-item">{failed_asin}</span>' for failed_asin in job.failed_asins)
+            st.markdown(f"""
+            <div class="failed-asin-list">
+                <div class="failed-asin-title">⚠️ Failed to retrieve images for {len(job.failed_asins)} ASINs:</div>
+                <div>{failed_items}</div>
+            </div>
+            """, unsafe_allow_html=True)
+    elif job.status == JOB_FAILED:
+        st.error(f"Job {job.job_id} failed: {job.error}")
+
+# Function to show where fetch time goes, from the same numbers the metrics
+# endpoint serves
+def render_fetch_stats_panel():
+    summary = get_default_fetch_metrics().summary()
+    if not summary['responses']:
+        return
     
-    if st.session_state.failed_asins:
-        failed_count = len(st.session_state.failed_asins)
-        st.markdown(f"""
-        <div class="failed-asin-list">
-            <div class="failed-asin-title">⚠️ Failed to retrieve images for {failed_count} ASINs:</div>
-            <div>
-        """, unsafe_allow_html=True)
+    with st.expander("Fetch timing stats"):
+        metrics_server = start_metrics_server()
+        if metrics_server is not None:
+            st.caption(f"OpenMetrics endpoint: {metrics_server.url}")
         
-        for failed_asin in st.session_state.failed_asins:
-            st.markdown(f'<span class="failed-asin-item">{failed_asin}</span>', unsafe_allow_html=True)
+        phases_df = pd.DataFrame(summary['phases']).set_index('phase')
+        st.dataframe(phases_df.style.format(precision=1, na_rep='-'))
         
-        st.markdown('</div></div>', unsafe_allow_html=True)
-            
-        log_display += '</div>'
-        log_container.markdown(log_display, unsafe_allow_html=True)
+        asins = summary['asins']
+        st.write(f"**ASINs:** {asins.get('success', 0)} succeeded, {asins.get('failed', 0)} failed")
+        st.write("**Responses by status:** " + ", ".join(f"{status}: {count}" for status, count in sorted(summary['responses'].items())))
+        if summary['retries']:
+            st.write("**Retries by reason:** " + ", ".join(f"{reason}: {count}" for reason, count in sorted(summary['retries'].items(), key=lambda item: -item[1])))
+        
+        coalescing = get_default_single_flight().report()
+        st.write(
+            f"**Single-flight:** {coalescing['shared']} of {coalescing['calls']} ASIN lookups shared an in-flight fetch "
+            f"({coalescing['shared_rate']:.0%}), {coalescing['in_flight']} fetches in flight now"
+        )
+
+# Function to show the enrichment jobs this session started and the status
+# of the active one. Running jobs are polled once a second.
+def render_job_panel():
+    jobs = get_default_job_registry().jobs(st.session_state.session_id)
+    if not jobs:
+        return
     
-    return enriched_df
+    st.markdown("### Enrichment jobs")
+    for job in jobs:
+        cols = st.columns([3, 2, 1])
+        cols[0].write(f"Job `{job.job_id}` - {job.total} ASINs - started {time.strftime('%H:%M:%S', time.localtime(job.created_at))}")
+        cols[1].write(f"{job.status} ({job.completed_count}/{job.total})")
+        if job.job_id != st.session_state.active_job_id:
+            if cols[2].button("View", key=f"view_job_{job.job_id}"):
+                st.session_state.active_job_id = job.job_id
+                st.session_state.loaded_job_id = None
+                st.rerun()
+    
+    active_job = get_default_job_registry().get(st.session_state.active_job_id)
+    if active_job is None:
+        return
+    
+    run_every = None if active_job.done else 1.0
+    st.fragment(render_job_status, run_every=run_every)(active_job.job_id)
+
+
+
+
+# Function to move a paged grid to another page
+def change_grid_page(page_key, page):
+    st.session_state[page_key] = page
+
+# Function to show Previous/Next controls for a paged grid and return the
+# page to render. Any change to filters (or the number of matching products)
+# sends the grid back to its first page.
+def render_page_controls(grid_key, total_rows, filters=None):
+    pages = page_count(total_rows)
+    page_key = f"{grid_key}_page"
+    filters_key = f"{grid_key}_page_filters"
+    
+    filters = (filters, total_rows)
+    if st.session_state.get(filters_key) != filters:
+        st.session_state[filters_key] = filters
+        st.session_state[page_key] = 0
+    page = min(st.session_state.get(page_key, 0), pages - 1)
+    
+    if pages > 1:
+        first = page * GRID_PAGE_SIZE + 1
+        last = min((page + 1) * GRID_PAGE_SIZE, total_rows)
+        col1, col2, col3 = st.columns([1, 4, 1])
+        with col1:
+            st.button("◀ Previous", key=f"{grid_key}_prev", on_click=change_grid_page, args=(page_key, page - 1), disabled=page == 0)
+        with col2:
+            st.caption(f"Page {page + 1} of {pages} (products {first}-{last} of {total_rows})")
+        with col3:
+            st.button("Next ▶", key=f"{grid_key}_next", on_click=change_grid_page, args=(page_key, page + 1), disabled=page >= pages - 1)
+    
+    return page
+
+# Function to get the tiles for one page of a grid and start building the
+# pages either side of it in the background, so Previous/Next only has to
+# send HTML that's already built. build_tiles turns a page of rows into a
+# list of tile HTML strings and columns names the ones it reads. Pages are
+# cached by content plus which images have local thumbnails, since that
+# changes the markup.
+def get_grid_page_tiles(grid_key, df, page, build_tiles, columns):
+    page_cache = get_default_grid_page_cache()
+    thumbnail_pipeline = get_default_thumbnail_pipeline()
+    pages = page_count(len(df))
+    
+    def page_key(page_df):
+        image_urls = page_df['Product_Image_URL'] if 'Product_Image_URL' in page_df.columns else []
+        thumbnails_ready = ''.join('1' if thumbnail_pipeline.has_thumbnails(image_url) else '0' for image_url in image_urls)
+        return grid_key, page_signature(page_df, columns), thumbnails_ready
+    
+    page_df = page_slice(df, page)
+    if 'Product_Image_URL' in page_df.columns:
+        thumbnail_pipeline.ensure(page_df['Product_Image_URL'])
+    tiles = page_cache.get(page_key(page_df), lambda: build_tiles(page_df))
+    
+    for neighbour in (page + 1, page - 1):
+        if 0 <= neighbour < pages:
+            neighbour_df = page_slice(df, neighbour)
+            if 'Product_Image_URL' in neighbour_df.columns:
+                thumbnail_pipeline.ensure(neighbour_df['Product_Image_URL'])
+            page_cache.prefetch(page_key(neighbour_df), lambda neighbour_df=neighbour_df: build_tiles(neighbour_df))
+    
+    return tiles
+
+NO_IMAGE_PLACEHOLDER_URL = "https://placehold.co/200x200?text=No+Image"
+
+# Function to read one column of a page as a plain list, or default for
+# every row when the column isn't there
+def page_column(page_df, column, default=''):
+    if column and column in page_df.columns:
+        return page_df[column].tolist()
+    return [default] * len(page_df)
+
+# Functions to render one tile of each grid. Each takes exactly the values
+# its tile fragment is cached under; _cache_key_has_thumbnail isn't read, it
+# only keys the tile apart once the product's local thumbnail exists, since
+# image_attributes then points at it.
+def render_fullscreen_grid_tile(image_url, asin, _cache_key_has_thumbnail):
+    image_attributes = get_default_thumbnail_pipeline().image_attributes(image_url, 'fullscreen')
+    return f"""
+        <div class="gallery-item">
+            <img {image_attributes} alt="Product {asin}" loading="lazy" decoding="async">
+            <div class="asin-tooltip">{asin}</div>
+        </div>
+        """
 
+def render_product_grid_tile(image_url, _cache_key_has_thumbnail):
+    image_attributes = get_default_thumbnail_pipeline().image_attributes(image_url, 'grid')
+    return f"""
+        <div class="grid-item">
+            <img {image_attributes} alt="Product" loading="lazy" decoding="async">
+        </div>
+        """
 
+def render_simple_grid_tile(image_url, _cache_key_has_thumbnail):
+    if not image_url:
+        return """
+            <div class="masonry-item" style="height:150px; display:flex; align-items:center; justify-content:center; text-align:center; color: #888; font-size: 12px;">
+                No Image Found
+            </div>
+            """
+    return f"""
+            <div class="masonry-item">
+                <img {get_default_thumbnail_pipeline().image_attributes(image_url, 'grid')} alt="Product Image" loading="lazy" decoding="async">
+            </div>
+            """
 
+def render_simple_fullscreen_grid_tile(image_url, _cache_key_has_thumbnail):
+    return f"""
+            <div class="masonry-item-fullscreen">
+                <img {get_default_thumbnail_pipeline().image_attributes(image_url, 'fullscreen')} alt="Product Image" loading="lazy" decoding="async">
+            </div>
+            """
+
+# Function to build the tiles of the fullscreen Amazon grid. Tiles are
+# built from plain column lists and come from the fragment cache wherever
+# the product has been rendered before.
+def build_fullscreen_grid_tiles(page_df, asin_column):
+    thumbnail_pipeline = get_default_thumbnail_pipeline()
+    image_urls = [image_url if isinstance(image_url, str) and image_url else NO_IMAGE_PLACEHOLDER_URL for image_url in page_column(page_df, 'Product_Image_URL')]
+    if asin_column and asin_column in page_df.columns:
+        asins = page_df[asin_column].tolist()
+    else:
+        asins = [f"Item_{i}" for i in page_df.index]  # Fallback if no ASIN column
+    rows = [(image_url, asin, thumbnail_pipeline.has_thumbnails(image_url)) for image_url, asin in zip(image_urls, asins)]
+    return get_default_tile_cache().render_all('fullscreen_grid', rows, render_fullscreen_grid_tile)
+
+# Function to build the tiles of the 5-column Amazon grid
+def build_product_grid_tiles(page_df):
+    thumbnail_pipeline = get_default_thumbnail_pipeline()
+    image_urls = [image_url if isinstance(image_url, str) and image_url else NO_IMAGE_PLACEHOLDER_URL for image_url in page_column(page_df, 'Product_Image_URL')]
+    rows = [(image_url, thumbnail_pipeline.has_thumbnails(image_url)) for image_url in image_urls]
+    return get_default_tile_cache().render_all('product_grid', rows, render_product_grid_tile)
+
+# Function to build the tiles of the 5-column Excel grid
+def build_simple_grid_tiles(page_df):
+    thumbnail_pipeline = get_default_thumbnail_pipeline()
+    image_urls = [image_url if isinstance(image_url, str) and image_url.strip() != '' else '' for image_url in page_column(page_df, 'Product_Image_URL')]
+    rows = [(image_url, thumbnail_pipeline.has_thumbnails(image_url)) for image_url in image_urls]
+    return get_default_tile_cache().render_all('simple_grid', rows, render_simple_grid_tile)
+
+# Function to build the tiles of the fullscreen Excel grid. Rows without an
+# image are left out.
+def build_simple_fullscreen_grid_tiles(page_df):
+    thumbnail_pipeline = get_default_thumbnail_pipeline()
+    image_urls = [image_url for image_url in page_column(page_df, 'Product_Image_URL') if isinstance(image_url, str) and image_url.strip() != '']
+    rows = [(image_url, thumbnail_pipeline.has_thumbnails(image_url)) for image_url in image_urls]
+    return get_default_tile_cache().render_all('simple_fullscreen_grid', rows, render_simple_fullscreen_grid_tile)
+
+# Function to find the ASIN column: 'Asin' if it exists, otherwise any
+# ASIN-like column, or None
+def find_asin_column(df):
+    if 'Asin' in df.columns:
+        return 'Asin'
+    for col in df.columns:
+        if col.lower().strip() in ['asin', 'sku']:
+            return col
+    return None
+
+# Function to work out which rows the grid search, price range and sort
+# select, in display order, as positions into df. Prices come from the
+# Numeric_Price column, so the range and the price sorts are plain numpy
+# comparisons and an argsort.
+def filter_product_positions(df, search_term=None, min_price=None, max_price=None, sort_by=None):
+    positions = np.arange(len(df))
+    
+    # Search goes through a trigram index built once per dataset, so each
+    # keystroke only checks the rows that can still match
+    if search_term:
+        search_index = get_search_index(df, ['Product_Title', 'Product_Description', find_asin_column(df)])
+        positions = search_index.search(search_term)
+    
+    if min_price is not None or max_price is not None or sort_by in ('Price (Low to High)', 'Price (High to Low)'):
+        prices = numeric_prices(df)[positions]
+    
+    # Rows without a price never match a price bound
+    if min_price is not None or max_price is not None:
+        in_range = ~np.isnan(prices)
+        if min_price is not None:
+            in_range &= prices >= min_price
+        if max_price is not None:
+            in_range &= prices <= max_price
+        positions = positions[in_range]
+        prices = prices[in_range]
+    
+    if sort_by:
+        if sort_by == 'Price (Low to High)':
+            # Unpriced rows go last either way
+            positions = positions[np.argsort(np.where(np.isnan(prices), np.inf, prices), kind='stable')]
+        elif sort_by == 'Price (High to Low)':
+            positions = positions[np.argsort(-np.where(np.isnan(prices), 0, prices), kind='stable')]
+        elif sort_by in ('Title (A-Z)', 'Title (Z-A)'):
+            titles = df['Product_Title'].iloc[positions].reset_index(drop=True)
+            order = titles.sort_values(ascending=sort_by == 'Title (A-Z)', kind='stable').index.to_numpy()
+            positions = positions[order]
+    
+    return positions
+
+# Function to get the products the grid should show. Views are memoized per
+# dataset version and filters, so a rerun with the same filters (or
+# switching to fullscreen and back) reuses the rows worked out before.
+def filter_products(df, search_term=None, min_price=None, max_price=None, sort_by=None):
+    view_key = ((search_term or '').lower(), min_price, max_price, sort_by)
+    return get_default_dataset_store().view(
+        df, view_key,
+        lambda dataset: filter_product_positions(dataset, search_term, min_price, max_price, sort_by)
+    )
 
 # Function to display fullscreen grid
 def display_fullscreen_grid(df, search_term=None, min_price=None, max_price=None, sort_by=None):
@@ -1226,60 +1271,9 @@ def display_fullscreen_grid(df, search_term=None, min_price=None, max_price=None
         st.warning("No data available to display.")
         return
         
-    filtered_df = df.copy()
-    
-    # Check if 'Asin' column exists, if not, try to find ASIN column
-    asin_column = None
-    if 'Asin' in filtered_df.columns:
-        asin_column = 'Asin'
-    else:
-        # Try to find any ASIN-like column
-        for col in filtered_df.columns:
-            if col.lower().strip() in ['asin', 'sku']:
-                asin_column = col
-                break
+    filtered_df = filter_products(df, search_term, min_price, max_price, sort_by)
     
-    if search_term and asin_column:
-        search_term_lower = search_term.lower()
-        filtered_df = filtered_df[
-            filtered_df['Product_Title'].str.lower().str.contains(search_term_lower, na=False) |
-            filtered_df['Product_Description'].str.lower().str.contains(search_term_lower, na=False) |
-            filtered_df[asin_column].str.lower().str.contains(search_term_lower, na=False)
-        ]
-    elif search_term:
-        search_term_lower = search_term.lower()
-        filtered_df = filtered_df[
-            filtered_df['Product_Title'].str.lower().str.contains(search_term_lower, na=False) |
-            filtered_df['Product_Description'].str.lower().str.contains(search_term_lower, na=False)
-        ]
-    
-    if min_price is not None:
-        filtered_df = filtered_df[filtered_df['Product_Price'].apply(
-            lambda x: any(char.isdigit() for char in str(x)) and float(re.findall(r'\d+\.\d+|\d+', str(x))[0]) >= min_price if re.findall(r'\d+\.\d+|\d+', str(x)) else False
-        )]
-    
-    if max_price is not None:
-        filtered_df = filtered_df[filtered_df['Product_Price'].apply(
-            lambda x: any(char.isdigit() for char in str(x)) and float(re.findall(r'\d+\.\d+|\d+', str(x))[0]) <= max_price if re.findall(r'\d+\.\d+|\d+', str(x)) else False
-        )]
-    
-    if sort_by:
-        if sort_by == 'Price (Low to High)':
-            filtered_df['Numeric_Price'] = filtered_df['Product_Price'].apply(
-                lambda x: float(re.findall(r'\d+\.\d+|\d+', str(x))[0]) if re.findall(r'\d+\.\d+|\d+', str(x)) else float('inf')
-            )
-            filtered_df = filtered_df.sort_values('Numeric_Price')
-            filtered_df = filtered_df.drop('Numeric_Price', axis=1)
-        elif sort_by == 'Price (High to Low)':
-            filtered_df['Numeric_Price'] = filtered_df['Product_Price'].apply(
-                lambda x: float(re.findall(r'\d+\.\d+|\d+', str(x))[0]) if re.findall(r'\d+\.\d+|\d+', str(x)) else 0
-            )
-            filtered_df = filtered_df.sort_values('Numeric_Price', ascending=False)
-            filtered_df = filtered_df.drop('Numeric_Price', axis=1)
-        elif sort_by == 'Title (A-Z)':
-            filtered_df = filtered_df.sort_values('Product_Title')
-        elif sort_by == 'Title (Z-A)':
-            filtered_df = filtered_df.sort_values('Product_Title', ascending=False)
+    asin_column = find_asin_column(filtered_df)
     
     if filtered_df.empty:
         st.warning("No products match your search criteria.")
@@ -1292,6 +1286,7 @@ def display_fullscreen_grid(df, search_term=None, min_price=None, max_price=None
         if st.button("✕", key="exit_fullscreen_amazon", help="Exit fullscreen"):
             st.session_state.fullscreen_mode = False
             st.rerun()
+        page = render_page_controls("amazon_fullscreen_grid", len(filtered_df), (search_term, min_price, max_price, sort_by))
     
     html_content = """
     <style>
@@ -1400,33 +1395,24 @@ def display_fullscreen_grid(df, search_term=None, min_price=None, max_price=None
         }
     </style>
     
-    <div class="fullscreen-container">
-        <div class="fullscreen-gallery-grid">
     """
     
-    for i, product in filtered_df.iterrows():
-        image_url = product['Product_Image_URL']
-        
-        # Get ASIN value - use the column we found earlier
-        if asin_column and asin_column in product:
-            asin = product[asin_column]
-        else:
-            asin = f"Item_{i}"  # Fallback if no ASIN column
-        
-        if not image_url:
-            image_url = "https://placehold.co/200x200?text=No+Image"
-            
-        html_content += f"""
-        <div class="gallery-item" style="--item-index: {i}">
-            <img src="{image_url}" alt="Product {asin}">
-            <div class="asin-tooltip">{asin}</div>
-        </div>
-        """
+    # Only the current page is built and sent
+    tiles = get_grid_page_tiles(
+        "amazon_fullscreen_grid", filtered_df, page,
+        lambda page_df: build_fullscreen_grid_tiles(page_df, asin_column),
+        ['Product_Image_URL', asin_column]
+    )
     
-    html_content += """
-        </div>
+    # Only the rows in view are kept in the DOM, so the iframe stays
+    # responsive however many products match
+    html_content += f"""
+    <div class="fullscreen-container">
+        {render_virtual_grid(tiles, 7, 8, 'fullscreen-gallery-grid', '.fullscreen-container')}
     </div>
+    """
     
+    html_content += """
     <script>
         document.addEventListener('keydown', function(event) {
             if (event.key === "Escape") {
@@ -1460,60 +1446,7 @@ def display_product_grid(df, search_term=None, min_price=None, max_price=None, s
         st.warning("No data available to display.")
         return
         
-    filtered_df = df.copy()
-    
-    # Check if 'Asin' column exists, if not, try to find ASIN column
-    asin_column = None
-    if 'Asin' in filtered_df.columns:
-        asin_column = 'Asin'
-    else:
-        # Try to find any ASIN-like column
-        for col in filtered_df.columns:
-            if col.lower().strip() in ['asin', 'sku']:
-                asin_column = col
-                break
-    
-    if search_term and asin_column:
-        search_term_lower = search_term.lower()
-        filtered_df = filtered_df[
-            filtered_df['Product_Title'].str.lower().str.contains(search_term_lower, na=False) |
-            filtered_df['Product_Description'].str.lower().str.contains(search_term_lower, na=False) |
-            filtered_df[asin_column].str.lower().str.contains(search_term_lower, na=False)
-        ]
-    elif search_term:
-        search_term_lower = search_term.lower()
-        filtered_df = filtered_df[
-            filtered_df['Product_Title'].str.lower().str.contains(search_term_lower, na=False) |
-            filtered_df['Product_Description'].str.lower().str.contains(search_term_lower, na=False)
-        ]
-    
-    if min_price is not None:
-        filtered_df = filtered_df[filtered_df['Product_Price'].apply(
-            lambda x: any(char.isdigit() for char in str(x)) and float(re.findall(r'\d+\.\d+|\d+', str(x))[0]) >= min_price if re.findall(r'\d+\.\d+|\d+', str(x)) else False
-        )]
-    
-    if max_price is not None:
-        filtered_df = filtered_df[filtered_df['Product_Price'].apply(
-            lambda x: any(char.isdigit() for char in str(x)) and float(re.findall(r'\d+\.\d+|\d+', str(x))[0]) <= max_price if re.findall(r'\d+\.\d+|\d+', str(x)) else False
-        )]
-    
-    if sort_by:
-        if sort_by == 'Price (Low to High)':
-            filtered_df['Numeric_Price'] = filtered_df['Product_Price'].apply(
-                lambda x: float(re.findall(r'\d+\.\d+|\d+', str(x))[0]) if re.findall(r'\d+\.\d+|\d+', str(x)) else float('inf')
-            )
-            filtered_df = filtered_df.sort_values('Numeric_Price')
-            filtered_df = filtered_df.drop('Numeric_Price', axis=1)
-        elif sort_by == 'Price (High to Low)':
-            filtered_df['Numeric_Price'] = filtered_df['Product_Price'].apply(
-                lambda x: float(re.findall(r'\d+\.\d+|\d+', str(x))[0]) if re.findall(r'\d+\.\d+|\d+', str(x)) else 0
-            )
-            filtered_df = filtered_df.sort_values('Numeric_Price', ascending=False)
-            filtered_df = filtered_df.drop('Numeric_Price', axis=1)
-        elif sort_by == 'Title (A-Z)':
-            filtered_df = filtered_df.sort_values('Product_Title')
-        elif sort_by == 'Title (Z-A)':
-            filtered_df = filtered_df.sort_values('Product_Title', ascending=False)
+    filtered_df = filter_products(df, search_term, min_price, max_price, sort_by)
     
     if filtered_df.empty:
         st.warning("No products match your search criteria.")
@@ -1543,30 +1476,24 @@ def display_product_grid(df, search_term=None, min_price=None, max_price=None, s
             background-color: white;
         }
         
+        body {
+            margin: 0;
+        }
+        
         .scrollable-container {
-            height: 100%;
+            height: 100vh;
             overflow-y: auto;
         }
     </style>
-    
-    <div class="scrollable-container">
-        <div class="image-grid">
     """
     
-    for i, product in filtered_df.iterrows():
-        image_url = product['Product_Image_URL']
-        
-        if not image_url:
-            image_url = "https://placehold.co/200x200?text=No+Image"
-            
-        html_content += f"""
-        <div class="grid-item">
-            <img src="{image_url}" alt="Product">
-        </div>
-        """
+    # Only the current page is built and sent
+    page = render_page_controls("amazon_grid", len(filtered_df), (search_term, min_price, max_price, sort_by))
+    tiles = get_grid_page_tiles("amazon_grid", filtered_df, page, build_product_grid_tiles, ['Product_Image_URL'])
     
-    html_content += """
-        </div>
+    html_content += f"""
+    <div class="scrollable-container">
+        {render_virtual_grid(tiles, 5, 4, 'image-grid', '.scrollable-container')}
     </div>
     """
     
@@ -1609,6 +1536,7 @@ def render_amazon_grid_tab():
     
     total_products = len(st.session_state.processed_data)
     st.write(f"Displaying images for {total_products} Amazon products in 5-column grid")
+    render_memory_report()
     
     if fullscreen_button:
         st.session_state.fullscreen_mode = True
@@ -1667,6 +1595,7 @@ def render_excel_grid_tab():
     with col1:
         total_products = len(st.session_state.processed_data)
         st.write(f"Displaying {total_products} images from Excel file in 5-column grid")
+        render_memory_report()
     
     with col2:
         fullscreen_button = st.button("🖼️ Full Screen View", key="excel_grid_fullscreen_btn", help="View images in a fullscreen 7-column grid")
@@ -1732,21 +1661,8 @@ def display_simple_product_grid(df):
         <div class="masonry-grid">
     """
     
-    for i, product in df.iterrows():
-        image_url = product.get('Product_Image_URL', '') 
-        
-        if image_url and image_url.strip() != '':
-            html_content += f"""
-            <div class="masonry-item">
-                <img src="{image_url}" alt="Product Image">
-            </div>
-            """
-        else:
-            html_content += f"""
-            <div class="masonry-item" style="height:150px; display:flex; align-items:center; justify-content:center; text-align:center; color: #888; font-size: 12px;">
-                No Image Found
-            </div>
-            """
+    page = render_page_controls("excel_grid", len(df))
+    html_content += ''.join(get_grid_page_tiles("excel_grid", df, page, build_simple_grid_tiles, ['Product_Image_URL']))
 
     html_content += """
         </div> 
@@ -1767,6 +1683,7 @@ def display_simple_fullscreen_grid(df):
         if st.button("✕", key="exit_fullscreen_excel_grid", help="Exit fullscreen (or press Esc)"):
             st.session_state.fullscreen_mode = False
             st.rerun()
+        page = render_page_controls("excel_fullscreen_grid", len(df))
 
     html_content = """
     <style>
@@ -1822,16 +1739,7 @@ def display_simple_fullscreen_grid(df):
         <div class="masonry-grid-fullscreen">
     """
     
-    for i, product in df.iterrows():
-        image_url = product.get('Product_Image_URL', '')
-        
-        if image_url and image_url.strip() != '':
-            style_attr = f'style="--item-index: {i};"' 
-            html_content += f"""
-            <div class="masonry-item-fullscreen" {style_attr}>
-                <img src="{image_url}" alt="Product Image">
-            </div>
-            """
+    html_content += ''.join(get_grid_page_tiles("excel_fullscreen_grid", df, page, build_simple_fullscreen_grid_tiles, ['Product_Image_URL']))
     
     html_content += """
         </div>
@@ -1864,6 +1772,12 @@ def display_simple_fullscreen_grid(df):
             }
         }
 
+        // Stagger the fade-in by position on the page; the tiles themselves
+        // are cached fragments and don't carry their position
+        document.querySelectorAll('.masonry-item-fullscreen').forEach((item, index) => {
+            item.style.setProperty('--item-index', index);
+        });
+
         window.addEventListener('load', enterFullscreenMode);
         window.parent.document.addEventListener('keydown', handleEscKey);
 
@@ -1898,6 +1812,33 @@ def render_upload_tab():
         key="process_limit_input"
     )
     
+    concurrency = st.number_input(
+        "Concurrent requests for Amazon ASINs:",
+        min_value=1,
+        max_value=MAX_CONCURRENCY,
+        value=DEFAULT_CONCURRENCY,
+        step=1,
+        help="How many ASINs are fetched at the same time. Lower this if Amazon starts returning errors.",
+        key="concurrency_input"
+    )
+    
+    workers = st.number_input(
+        "Worker processes for Amazon ASINs (0 = fetch in the app process):",
+        min_value=0,
+        max_value=16,
+        value=0,
+        step=1,
+        help="Split the ASINs into shards and fetch them in separate processes, sharing the concurrent requests between them. Useful for very large uploads.",
+        key="workers_input"
+    )
+    
+    use_cache = st.checkbox(
+        "Use cached product details",
+        value=True,
+        help="Reuse titles, prices and images fetched recently instead of scraping them again. Prices expire sooner than titles and images.",
+        key="use_cache_checkbox"
+    )
+    
     if uploaded_file is not None:
         try:
             if uploaded_file.name.endswith('.csv'):
@@ -2013,18 +1954,22 @@ def render_upload_tab():
                 st.warning(f"You've chosen to process only {process_limit} rows out of {total_rows} total rows.")
             
             if st.button("Process and Fetch Product Details", key="process_button_unique", help="Click to start processing the uploaded file"):
+                max_rows = process_limit if process_limit > 0 else None
                 if csv_type == 'unknown':
                     st.error("Could not detect file format. Please ensure your file contains either 'Asin' column for Amazon products or direct image URLs.")
+                elif csv_type == 'amazon':
+                    if not any(col.lower() in ['asin', 'sku'] for col in df.columns):
+                        st.error("The CSV file must contain an 'Asin' column for Amazonr products.")
+                    else:
+                        job = start_amazon_job(df, max_rows, concurrency, use_cache, workers)
+                        if job is not None:
+                            st.info(f"Started job {job.job_id} in the background. You can switch tabs or reload the page while it runs.")
                 else:
                     with st.spinner("Processing data and fetching details..."):
-                        max_rows = process_limit if process_limit > 0 else None
-                        st.session_state.processed_data = process_csv_data(df, max_rows)
+                        set_processed_data(process_csv_data(df, max_rows))
                         
                         if st.session_state.processed_data is not None:
-                            if csv_type == 'amazon':
-                                st.success("Amazon data processed successfully! Switch to Amazon Grid Images tab to view results.")
-                            else:
-                                st.success(f"Data from last sheet ('{last_sheet}') processed successfully! Switch to Excel Grid Images tab to view results.")
+                            st.success(f"Data from last sheet ('{last_sheet}') processed successfully! Switch to Excel Grid Images tab to view results.")
                         else:
                             st.error("Failed to process data. Please check your file format.")
         
@@ -2041,6 +1986,11 @@ def render_upload_tab():
             </ul>
             </div>
             """, unsafe_allow_html=True)
+    
+    # Jobs keep running across reruns, so their status is shown whether or
+    # not a file is currently uploaded
+    render_job_panel()
+    render_fetch_stats_panel()
 
 # Main app function
 def main():
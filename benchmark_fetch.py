@@ -0,0 +1,95 @@
+import argparse
+import math
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fetcher import get_amazon_product_details
+from rate_limiter import AdaptiveRateLimiter
+from replay_server import add_fault_arguments, server_from_args
+from session_pool import SessionPool
+
+UNTHROTTLED_RATE = 100000.0
+
+
+# Function to get the pct-th percentile of a list of numbers (nearest rank)
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+# Function to fetch asins through get_amazon_product_details at one
+# concurrency level, with a fresh session pool and rate limiter so levels
+# don't warm each other up. Latency is per ASIN, retries and backoff
+# included, since that is what a user waits for.
+def run_level(base_url, asins, concurrency, adaptive=False):
+    session_pool = SessionPool(concurrency)
+    if adaptive:
+        rate_limiter = AdaptiveRateLimiter()
+    else:
+        rate_limiter = AdaptiveRateLimiter(initial_rate=UNTHROTTLED_RATE, max_rate=UNTHROTTLED_RATE)
+    log_queue = queue.Queue()
+
+    def timed_fetch(index, asin):
+        start = time.perf_counter()
+        product_details = get_amazon_product_details(
+            asin, log_queue, index + 1, len(asins),
+            session_pool=session_pool, rate_limiter=rate_limiter, base_url=base_url
+        )
+        return time.perf_counter() - start, product_details
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(timed_fetch, range(len(asins)), asins))
+    elapsed = time.perf_counter() - start
+    session_pool.close()
+
+    latencies = [latency for latency, _ in results]
+    successes = sum(1 for _, product_details in results if product_details['success'])
+    return {
+        'concurrency': concurrency,
+        'asins': len(asins),
+        'seconds': elapsed,
+        'asins_per_second': len(asins) / elapsed if elapsed else 0.0,
+        'p50': percentile(latencies, 50),
+        'p95': percentile(latencies, 95),
+        'p99': percentile(latencies, 99),
+        'success_rate': successes / len(asins) if asins else 0.0,
+        'final_rate': rate_limiter.rate
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark fetch throughput against the replay server.')
+    parser.add_argument('--levels', default='1,4,8,16', help='Comma-separated concurrency levels')
+    parser.add_argument('--asins', type=int, default=200, help='ASINs to fetch per level')
+    parser.add_argument('--url', default=None, help='Base URL of a running replay server; one is started in-process if omitted')
+    parser.add_argument('--adaptive', action='store_true', help='Pace with the default adaptive rate limiter instead of running unthrottled')
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.url
+    if base_url is None:
+        server = server_from_args(args).start()
+        base_url = server.base_url
+
+    levels = [int(level) for level in args.levels.split(',') if level.strip()]
+    print(f'Fetching {args.asins} ASINs per level from {base_url}'
+          + (' with the adaptive rate limiter' if args.adaptive else ' unthrottled'))
+    print(f'{"conc":>5} {"ASINs/s":>9} {"p50 s":>8} {"p95 s":>8} {"p99 s":>8} {"success":>8} {"total s":>8}')
+
+    try:
+        for level_index, concurrency in enumerate(levels):
+            # Distinct ASINs per level so nothing is served from a warm cache
+            asins = [f'B{level_index:02d}{index:07d}' for index in range(args.asins)]
+            result = run_level(base_url, asins, concurrency, args.adaptive)
+            print(f'{concurrency:>5} {result["asins_per_second"]:>9.2f} {result["p50"]:>8.3f} {result["p95"]:>8.3f} '
+                  f'{result["p99"]:>8.3f} {result["success_rate"]:>8.1%} {result["seconds"]:>8.2f}')
+    finally:
+        if server is not None:
+            server.stop()
+            print(f'Server: {server.stats}')
@@ -0,0 +1,90 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+from parsers import PARSER_BACKENDS, extract_fields_fast, extract_product_fields, extract_product_fields_with_fast_path
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus')
+GOLDEN_FILE = 'golden.json'
+FIELDS = ('title', 'price', 'image_url')
+
+
+# Function to time fn(*args) and return (best seconds, mean seconds, result)
+def time_call(fn, args, repeat):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings), sum(timings) / len(timings), result
+
+
+# Function to list the fields where result differs from the golden values
+def golden_mismatches(result, golden):
+    return [field for field in FIELDS if result[field] != golden[field]]
+
+
+# Function to benchmark every corpus page: the raw-text fast path, the DOM
+# plan on each installed backend, and the combined path that
+# get_amazon_product_details runs (fast path, then DOM where needed). The
+# combined path must reproduce golden.json exactly on every backend; the
+# DOM-only numbers are checked against html.parser so the backends can't
+# drift apart. Returns the number of mismatches.
+def run_benchmark(corpus_dir=CORPUS_DIR, repeat=20, backends=None):
+    with open(os.path.join(corpus_dir, GOLDEN_FILE), encoding='utf-8') as golden_file:
+        golden = json.load(golden_file)
+    backends = backends or list(PARSER_BACKENDS)
+    mismatches = 0
+
+    for path in sorted(glob.glob(os.path.join(corpus_dir, '*.html'))):
+        name = os.path.basename(path)
+        with open(path, encoding='utf-8') as page_file:
+            page_html = page_file.read()
+        print(f'{name} ({len(page_html) / 1024:.0f} KiB)')
+
+        if name not in golden:
+            print(f'  no golden values for {name}, skipping')
+            continue
+        expected = golden[name]
+
+        best, mean, fast_fields = time_call(extract_fields_fast, (page_html,), repeat)
+        found = [field for field in FIELDS if fast_fields[field] is not None]
+        print(f'  {"fast path":24} best {best * 1000:8.3f} ms  mean {mean * 1000:8.3f} ms  found {", ".join(found) or "nothing"}')
+
+        reference = extract_product_fields(page_html, 'html.parser')
+        for backend in backends:
+            best, mean, dom_fields = time_call(extract_product_fields, (page_html, backend), repeat)
+            status = 'ok' if dom_fields == reference else 'MISMATCH vs html.parser'
+            if dom_fields != reference:
+                mismatches += 1
+            print(f'  {"dom " + backend:24} best {best * 1000:8.3f} ms  mean {mean * 1000:8.3f} ms  {status}')
+
+        for backend in backends:
+            best, mean, (fields, parse_path) = time_call(extract_product_fields_with_fast_path, (page_html, backend), repeat)
+            wrong = golden_mismatches(fields, expected)
+            if wrong:
+                mismatches += 1
+                status = 'GOLDEN MISMATCH: ' + ', '.join(f'{field}={fields[field]!r}' for field in wrong)
+            else:
+                status = f'ok ({parse_path})'
+            print(f'  {"fetch path " + backend:24} best {best * 1000:8.3f} ms  mean {mean * 1000:8.3f} ms  {status}')
+
+    return mismatches
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Time title, price and image extraction over the saved page corpus and check it against golden values.')
+    parser.add_argument('--corpus', default=CORPUS_DIR, help='Directory with *.html pages and golden.json')
+    parser.add_argument('--repeat', type=int, default=20, help='Timed runs per page and extractor')
+    parser.add_argument('--backend', action='append', choices=sorted(PARSER_BACKENDS), help='Only benchmark this backend (repeatable)')
+    args = parser.parse_args()
+
+    mismatches = run_benchmark(args.corpus, args.repeat, args.backend)
+    if mismatches:
+        print(f'{mismatches} mismatches')
+        sys.exit(1)
+    print('All extractions match')
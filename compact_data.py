@@ -0,0 +1,71 @@
+import importlib.util
+
+import pandas as pd
+
+HAS_PYARROW = importlib.util.find_spec('pyarrow') is not None
+
+# A text column becomes categorical when it has at most one distinct value
+# per this many rows. Constant columns ('N/A' ratings, 'See Details' prices)
+# end up as one category and a byte per row.
+CATEGORY_ROWS_PER_VALUE = 2
+
+# Unique-ish text (titles, links, ASINs) goes into Arrow string buffers
+# instead of one Python object per cell
+STRING_DTYPE = 'string[pyarrow]' if HAS_PYARROW else None
+
+
+def _all_instances(values, kind):
+    return all(isinstance(value, kind) for value in values)
+
+
+# Function to pick a compact dtype for one column, or None to leave it.
+# Text can arrive as object columns or, on newer pandas, as string columns
+# that are already Arrow-backed; either way mostly-repeated text is made
+# categorical.
+def compact_dtype(column):
+    if isinstance(column.dtype, pd.StringDtype):
+        is_text = True
+    elif column.dtype == object:
+        values = column.dropna().tolist()
+        if len(values) == len(column) and values and _all_instances(values, bool):
+            return 'bool'
+        # Mixed types (say ints and strings from a spreadsheet) stay as they are
+        is_text = _all_instances(values, str)
+    else:
+        return None
+
+    if not is_text:
+        return None
+    if column.nunique() * CATEGORY_ROWS_PER_VALUE <= len(column):
+        return 'category'
+    return STRING_DTYPE if column.dtype == object else None
+
+
+# Function to convert a processed DataFrame to a compact columnar schema.
+# Returns (compact_df, report) where report compares the memory use before
+# and after.
+def compact_dataframe(df):
+    dtypes = {}
+    for name in df.columns:
+        dtype = compact_dtype(df[name])
+        if dtype is not None:
+            dtypes[name] = dtype
+    compact_df = df.astype(dtypes) if dtypes else df
+    return compact_df, memory_report(df, compact_df)
+
+
+# Function to summarise the memory a DataFrame takes before and after
+# compaction, overall and per row
+def memory_report(before, after):
+    rows = max(len(before), 1)
+    bytes_before = int(before.memory_usage(deep=True).sum())
+    bytes_after = int(after.memory_usage(deep=True).sum())
+    return {
+        'rows': len(before),
+        'bytes_before': bytes_before,
+        'bytes_after': bytes_after,
+        'bytes_per_row_before': bytes_before / rows,
+        'bytes_per_row_after': bytes_after / rows,
+        'categorical_columns': [name for name in after.columns if isinstance(after[name].dtype, pd.CategoricalDtype)],
+        'constant_columns': [name for name in after.columns if after[name].nunique(dropna=False) == 1]
+    }
@@ -0,0 +1,107 @@
+import hashlib
+import threading
+import weakref
+from collections import OrderedDict
+
+import pandas as pd
+
+MAX_DATASETS = 8
+MAX_VIEWS = 64
+
+
+# Function to compute the content version of a DataFrame: a hash of its
+# columns, dtypes, index and every value. Equal data gives an equal version
+# however it was loaded.
+def dataset_version(df):
+    digest = hashlib.sha1()
+    digest.update(repr([(str(column), str(dtype)) for column, dtype in df.dtypes.items()]).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    return digest.hexdigest()[:16]
+
+
+# Process-wide store of processed datasets keyed by content version, plus
+# memoized views of them. A view is the row positions a given search, price
+# range and sort selects, so revisiting a filter (or switching between the
+# grid and fullscreen, which share views) is a dictionary lookup and an iloc.
+# Datasets are treated as immutable once stored; anything that changes the
+# data makes a new DataFrame and so a new version.
+class DatasetStore:
+    def __init__(self, max_datasets=MAX_DATASETS, max_views=MAX_VIEWS):
+        self.max_datasets = max_datasets
+        self.max_views = max_views
+        self._datasets = OrderedDict()
+        self._views = OrderedDict()
+        # id(df) -> (weak reference, version), so the DataFrame already in
+        # session state isn't hashed again on every rerun
+        self._known = {}
+        self._lock = threading.Lock()
+        self.stats = {'view_hits': 0, 'view_misses': 0}
+
+    # Function to store a dataset and return its version
+    def put(self, df):
+        with self._lock:
+            known = self._known.get(id(df))
+            if known is not None and known[0]() is df:
+                return known[1]
+
+        version = dataset_version(df)
+        with self._lock:
+            try:
+                self._known[id(df)] = (weakref.ref(df, lambda _, key=id(df): self._forget(key)), version)
+            except TypeError:
+                pass
+            self._datasets[version] = df
+            self._datasets.move_to_end(version)
+            while len(self._datasets) > self.max_datasets:
+                evicted, _ = self._datasets.popitem(last=False)
+                for key in [key for key in self._views if key[0] == evicted]:
+                    del self._views[key]
+        return version
+
+    # Called by the garbage collector, possibly while this thread holds the
+    # lock, so it mustn't take it; a single dict pop is atomic anyway
+    def _forget(self, key):
+        self._known.pop(key, None)
+
+    def get(self, version):
+        with self._lock:
+            return self._datasets.get(version)
+
+    # Function to get the view of a dataset for view_key (the filters that
+    # produce it), computing it with compute(df) -> row positions the first
+    # time. Returns the rows as a DataFrame.
+    def view(self, df, view_key, compute):
+        key = (self.put(df),) + tuple(view_key)
+        with self._lock:
+            positions = self._views.get(key)
+            if positions is not None:
+                self._views.move_to_end(key)
+                self.stats['view_hits'] += 1
+
+        if positions is None:
+            positions = compute(df)
+            with self._lock:
+                self.stats['view_misses'] += 1
+                self._views[key] = positions
+                while len(self._views) > self.max_views:
+                    self._views.popitem(last=False)
+        return df.iloc[positions]
+
+    def report(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['datasets'] = len(self._datasets)
+            stats['views'] = len(self._views)
+        return stats
+
+
+_default_dataset_store = None
+_default_dataset_store_lock = threading.Lock()
+
+# Function to get the process-wide dataset store
+def get_default_dataset_store():
+    global _default_dataset_store
+    with _default_dataset_store_lock:
+        if _default_dataset_store is None:
+            _default_dataset_store = DatasetStore()
+        return _default_dataset_store
@@ -0,0 +1,193 @@
+import bisect
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_METRICS_PORT = int(os.environ.get('METRICS_PORT', '9464'))
+
+# Upper bounds, in seconds, of the histogram buckets used for every phase
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Where the seconds of one fetch attempt go: TCP/TLS connect, waiting for
+# the first response byte, reading the body, parsing it, waiting on the rate
+# limiter, and sleeping before a retry
+PHASES = ('connect', 'ttfb', 'download', 'parse', 'rate_limit_wait', 'retry_sleep')
+
+OPENMETRICS_CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    # Function to estimate a quantile as the upper bound of the bucket it
+    # falls in (None past the last bucket, or with no observations)
+    def quantile(self, q):
+        if not self.count:
+            return None
+        target = q * self.count
+        running = 0
+        for index, bucket_count in enumerate(self.counts):
+            running += bucket_count
+            if running >= target:
+                return self.buckets[index] if index < len(self.buckets) else None
+        return None
+
+
+# Process-wide timing histograms and counters for the fetch path. Every
+# attempt in get_amazon_product_details reports its phase timings, status
+# code and (when it leads to a retry) the reason. The numbers are served as
+# OpenMetrics text by start_metrics_server and summarised for the stats panel.
+class FetchMetrics:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self._lock = threading.Lock()
+        self.buckets = buckets
+        self.histograms = {phase: Histogram(buckets) for phase in PHASES}
+        self.responses = {}
+        self.retries = {}
+        self.asins = {}
+
+    def observe(self, phase, seconds):
+        with self._lock:
+            self.histograms[phase].observe(seconds)
+
+    # Function to record one finished attempt. timings maps phase -> seconds
+    # for whichever phases the attempt went through; status is the HTTP status
+    # code (None when the request itself failed).
+    def record_attempt(self, timings, status=None):
+        with self._lock:
+            for phase, seconds in timings.items():
+                self.histograms[phase].observe(seconds)
+            key = str(status) if status is not None else 'none'
+            self.responses[key] = self.responses.get(key, 0) + 1
+
+    def record_retry(self, reason):
+        with self._lock:
+            self.retries[reason] = self.retries.get(reason, 0) + 1
+
+    def record_asin(self, success):
+        outcome = 'success' if success else 'failed'
+        with self._lock:
+            self.asins[outcome] = self.asins.get(outcome, 0) + 1
+
+    # Function to summarise every phase for the in-app stats panel
+    def summary(self):
+        with self._lock:
+            rows = []
+            for phase, histogram in self.histograms.items():
+                rows.append({
+                    'phase': phase,
+                    'count': histogram.count,
+                    'total_seconds': histogram.sum,
+                    'mean_ms': histogram.sum / histogram.count * 1000 if histogram.count else None,
+                    'p50_ms': _bound_ms(histogram.quantile(0.5)),
+                    'p95_ms': _bound_ms(histogram.quantile(0.95)),
+                    'p99_ms': _bound_ms(histogram.quantile(0.99))
+                })
+            return {
+                'phases': rows,
+                'responses': dict(self.responses),
+                'retries': dict(self.retries),
+                'asins': dict(self.asins)
+            }
+
+    # Function to render every metric in the OpenMetrics text format
+    def render_openmetrics(self):
+        lines = [
+            '# TYPE amazon_fetch_phase_seconds histogram',
+            '# HELP amazon_fetch_phase_seconds Time spent in each phase of a product page fetch attempt.'
+        ]
+        with self._lock:
+            for phase, histogram in self.histograms.items():
+                running = 0
+                for bound, bucket_count in zip(histogram.buckets, histogram.counts):
+                    running += bucket_count
+                    lines.append(f'amazon_fetch_phase_seconds_bucket{{phase="{phase}",le="{bound}"}} {running}')
+                lines.append(f'amazon_fetch_phase_seconds_bucket{{phase="{phase}",le="+Inf"}} {histogram.count}')
+                lines.append(f'amazon_fetch_phase_seconds_count{{phase="{phase}"}} {histogram.count}')
+                lines.append(f'amazon_fetch_phase_seconds_sum{{phase="{phase}"}} {histogram.sum}')
+
+            for name, label, help_text, counts in (
+                ('amazon_fetch_responses', 'status', 'Fetch attempts by HTTP status code.', self.responses),
+                ('amazon_fetch_retries', 'reason', 'Fetch attempts that led to a retry, by reason.', self.retries),
+                ('amazon_fetch_asins', 'outcome', 'ASINs fetched, by outcome.', self.asins)
+            ):
+                lines.append(f'# TYPE {name} counter')
+                lines.append(f'# HELP {name} {help_text}')
+                for value, count in sorted(counts.items()):
+                    escaped = value.replace('\\', '\\\\').replace('"', '\\"')
+                    lines.append(f'{name}_total{{{label}="{escaped}"}} {count}')
+
+        lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+
+def _bound_ms(seconds):
+    return seconds * 1000 if seconds is not None else None
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = self.server.metrics.render_openmetrics().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', OPENMETRICS_CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class MetricsServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, metrics, host='127.0.0.1', port=DEFAULT_METRICS_PORT):
+        super().__init__((host, port), MetricsRequestHandler)
+        self.metrics = metrics
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}/metrics'
+
+
+_default_fetch_metrics = None
+_default_metrics_server = None
+_default_fetch_metrics_lock = threading.Lock()
+
+# Function to get the process-wide fetch metrics
+def get_default_fetch_metrics():
+    global _default_fetch_metrics
+    with _default_fetch_metrics_lock:
+        if _default_fetch_metrics is None:
+            _default_fetch_metrics = FetchMetrics()
+        return _default_fetch_metrics
+
+
+# Function to serve the default metrics on /metrics, once per process.
+# Returns the server, or None if the port is already taken (another app
+# process is serving there).
+def start_metrics_server(host='127.0.0.1', port=DEFAULT_METRICS_PORT):
+    global _default_metrics_server
+    metrics = get_default_fetch_metrics()
+    with _default_fetch_metrics_lock:
+        if _default_metrics_server is None:
+            try:
+                _default_metrics_server = MetricsServer(metrics, host, port)
+            except OSError:
+                return None
+            threading.Thread(target=_default_metrics_server.serve_forever, name='metrics-server', daemon=True).start()
+        return _default_metrics_server
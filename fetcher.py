@@ -0,0 +1,417 @@
+import codecs
+import os
+import queue
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from parsers import (
+    DEFAULT_PARSER_BACKEND,
+    REGION_END_MARKERS,
+    extract_fields_fast,
+    extract_product_fields_with_fast_path,
+    product_region_complete
+)
+from rate_limiter import get_default_rate_limiter
+from fetch_metrics import PHASES, get_default_fetch_metrics
+from session_pool import SessionPool
+from single_flight import get_default_single_flight
+
+# Where product pages are fetched from. Pointing this at replay_server.py
+# (through the environment, so shard workers pick it up too) lets the fetch
+# path be benchmarked without touching amazon.com.
+AMAZON_BASE_URL = os.environ.get('AMAZON_BASE_URL', 'https://www.amazon.com')
+
+DEFAULT_CONCURRENCY = 8
+MAX_CONCURRENCY = 32
+
+DEFAULT_STREAMING = True
+STREAM_CHUNK_SIZE = 16384
+STREAM_MARKER_OVERLAP = 64
+
+ROBOT_CHECK_MARKERS = ('/errors/validateCaptcha', 'api-services-support@amazon.com', 'Robot Check')
+
+# Placeholder values a product_details dict starts with; a field still
+# holding its placeholder hasn't been found on any attempt yet
+FIELD_PLACEHOLDERS = {
+    'title': 'Product information not available',
+    'price': 'N/A',
+    'image_url': ''
+}
+
+_default_session_pool = None
+_default_session_pool_lock = threading.Lock()
+
+# Function to get the process-wide session pool, created on first use. The
+# pool is shared by every running job, so it only ever grows to the largest
+# size asked for; each job's own worker count already caps how many sessions
+# it leases at once, and shrinking it would cut into other jobs' leases.
+def get_default_session_pool(size=DEFAULT_CONCURRENCY):
+    global _default_session_pool
+    with _default_session_pool_lock:
+        if _default_session_pool is None:
+            _default_session_pool = SessionPool(size)
+        elif size > _default_session_pool.size:
+            _default_session_pool.resize(size)
+        return _default_session_pool
+
+# Function to tell whether Amazon answered with a throttle or robot-check
+# page. Returns the reason as a short string, or None for a normal response.
+def get_block_reason(status_code, page_text):
+    if status_code == 429:
+        return '429 Too Many Requests'
+    if status_code == 503:
+        return '503 Service Unavailable'
+    if any(marker in page_text for marker in ROBOT_CHECK_MARKERS):
+        return 'robot check page'
+    return None
+
+# Function to count the bytes a response has read off the wire so far, before
+# any gzip/br decoding. Both fetch paths report this, so bytes_downloaded and
+# bytes_saved (against Content-Length, also a wire size) share one unit.
+def wire_bytes_read(response):
+    try:
+        return response.raw.tell()
+    except AttributeError:
+        # Responses built without a urllib3 body (tests, mocks) have no
+        # wire count; the body length is the closest thing
+        return len(response.content)
+
+# Function to download a product page in chunks and stop as soon as the
+# product block has arrived and the fast path can read every needed field
+# from it (all of them unless needed says otherwise).
+# Only the product block is ever read by the extractors, so once it is
+# complete the rest of the page (reviews, A+ content, carousels) can't change
+# the result. Returns (page_text, fields, stats); fields is None when the
+# page had to be read to the end. Closing early gives up the keep-alive
+# connection, which is far cheaper than the hundreds of KB left unread.
+def stream_product_page(response, chunk_size=STREAM_CHUNK_SIZE, needed=None):
+    needed = list(FIELD_PLACEHOLDERS) if needed is None else list(needed)
+    decoder = codecs.getincrementaldecoder(response.encoding or 'utf-8')(errors='replace')
+    parts = []
+    tail = ''
+    fields = None
+    region_checked = False
+    
+    try:
+        for chunk in response.iter_content(chunk_size):
+            text = decoder.decode(chunk)
+            parts.append(text)
+            if region_checked:
+                continue
+        
+            window = tail + text
+            tail = window[-STREAM_MARKER_OVERLAP:]
+            if not any(marker in window for marker in REGION_END_MARKERS):
+                continue
+        
+            page_text = ''.join(parts)
+            if not product_region_complete(page_text):
+                continue
+            region_checked = True
+            candidate_fields = extract_fields_fast(page_text)
+            if all(candidate_fields[name] is not None for name in needed):
+                fields = candidate_fields
+                break
+        else:
+            parts.append(decoder.decode(b'', final=True))
+        bytes_read = wire_bytes_read(response)
+    finally:
+        response.close()
+    
+    content_length = response.headers.get('Content-Length')
+    stats = {
+        'stopped_early': fields is not None,
+        'bytes_downloaded': bytes_read,
+        'bytes_saved': None
+    }
+    if fields is None:
+        stats['bytes_saved'] = 0
+    elif content_length and content_length.isdigit():
+        stats['bytes_saved'] = max(0, int(content_length) - bytes_read)
+    
+    return ''.join(parts), fields, stats
+
+# Function to list the fields a product_details dict is still missing
+def get_missing_fields(product_details):
+    return [name for name, placeholder in FIELD_PLACEHOLDERS.items() if product_details[name] == placeholder]
+
+# Function to get Amazon product details
+# Fields found on one attempt are kept, and every later attempt only looks for
+# what is still missing. Every extraction strategy is tried on a downloaded
+# page before it counts as a miss, so a retry is only spent on a page that
+# genuinely lacked the field.
+# known_fields seeds fields that are already known (fresh values from the
+# product cache), so only the rest are looked for and a streamed page can stop
+# as soon as those have arrived.
+# Each attempt is timed phase by phase (see fetch_metrics.PHASES) and reported
+# to metrics along with its status code and, if it leads to a retry, why.
+# Runs on worker threads, so it must never touch st.session_state; progress
+# goes out through progress_queue and log lines through log_queue.
+def get_amazon_product_details(asin, log_queue, processing_id, total_count, progress_queue=None, session_pool=None, rate_limiter=None, parser_backend=DEFAULT_PARSER_BACKEND, stream=DEFAULT_STREAMING, base_url=AMAZON_BASE_URL, metrics=None, known_fields=None):
+    if session_pool is None:
+        session_pool = get_default_session_pool()
+    if rate_limiter is None:
+        rate_limiter = get_default_rate_limiter()
+    if metrics is None:
+        metrics = get_default_fetch_metrics()
+    
+    if progress_queue is not None:
+        progress_queue.put((processing_id, total_count))
+    
+    log_queue.put(('info', f'Starting to process ASIN: {asin} ({processing_id}/{total_count})'))
+    
+    product_details = {
+        'asin': asin,
+        'title': 'Product information not available',
+        'price': 'N/A',
+        'image_url': '',
+        'success': False,
+        'retry_count': 0,
+        'error': None,
+        'parse_path': None,
+        'bytes_downloaded': 0,
+        'bytes_saved': 0,
+        'stopped_early': False,
+        'timings': {phase: 0.0 for phase in PHASES}
+    }
+    if known_fields:
+        product_details.update({name: value for name, value in known_fields.items() if name in FIELD_PLACEHOLDERS})
+
+    block_reason = None
+    retry_after = None
+    
+    for attempt in range(3):
+        url = f"{base_url}/dp/{asin}"
+        timings = {}
+        status_code = None
+        retry_reason = None
+        
+        log_queue.put(('info', f'ASIN {asin}: Attempt {attempt+1}/3 started'))
+        
+        if attempt > 0:
+            if block_reason:
+                sleep_time = rate_limiter.backoff_delay(attempt, retry_after)
+            else:
+                sleep_time = 2 + random.uniform(1, 3)
+            log_queue.put(('info', f'ASIN {asin}: Waiting {sleep_time:.2f} seconds before retry'))
+            time.sleep(sleep_time)
+            timings['retry_sleep'] = sleep_time
+        
+        block_reason = None
+        retry_after = None
+        
+        try:
+            wait_start = time.perf_counter()
+            rate_limiter.acquire()
+            timings['rate_limit_wait'] = time.perf_counter() - wait_start
+            early_fields = None
+            needed = get_missing_fields(product_details)
+            with session_pool.lease() as lease:
+                request_start = time.perf_counter()
+                response = lease.get(url, timeout=15, stream=stream)
+                returned_at = time.perf_counter()
+                status_code = response.status_code
+                # response.elapsed runs from sending the request to parsing
+                # the headers, so it covers the connect (if any) and the TTFB
+                timings['connect'] = lease.connect_seconds
+                timings['ttfb'] = max(0.0, response.elapsed.total_seconds() - lease.connect_seconds)
+                if stream and response.status_code == 200:
+                    download_start = time.perf_counter()
+                    page_text, early_fields, stream_stats = stream_product_page(response, needed=needed)
+                    timings['download'] = time.perf_counter() - download_start
+                    product_details['bytes_downloaded'] += stream_stats['bytes_downloaded']
+                    if stream_stats['bytes_saved'] is None:
+                        product_details['bytes_saved'] = None
+                    elif product_details['bytes_saved'] is not None:
+                        product_details['bytes_saved'] += stream_stats['bytes_saved']
+                    product_details['stopped_early'] = stream_stats['stopped_early']
+                else:
+                    download_start = time.perf_counter()
+                    page_text = response.text
+                    product_details['bytes_downloaded'] += wire_bytes_read(response)
+                    if stream:
+                        timings['download'] = time.perf_counter() - download_start
+                    else:
+                        timings['download'] = max(0.0, returned_at - request_start - response.elapsed.total_seconds())
+                block_reason = get_block_reason(response.status_code, page_text)
+                if block_reason:
+                    lease.mark_blocked()
+            
+            if block_reason:
+                retry_after = response.headers.get('Retry-After')
+                rate_message = rate_limiter.record_block(block_reason)
+                if rate_message:
+                    log_queue.put(('warning', rate_message))
+                log_queue.put(('warning', f'ASIN {asin}: Blocked ({block_reason}) on attempt {attempt+1}, rotating session'))
+                retry_reason = block_reason
+                continue
+            
+            if response.status_code == 200:
+                rate_message = rate_limiter.record_success()
+                if rate_message:
+                    log_queue.put(('info', rate_message))
+                
+                parse_start = time.perf_counter()
+                if early_fields is not None:
+                    fields, parse_path = early_fields, 'fast'
+                else:
+                    fields, parse_path = extract_product_fields_with_fast_path(page_text, parser_backend, needed)
+                timings['parse'] = time.perf_counter() - parse_start
+                product_details['parse_path'] = parse_path
+                
+                log_queue.put(('success', f'ASIN {asin}: Retrieved page on attempt {attempt+1} '
+                               f'(connect {timings["connect"] * 1000:.0f} ms, TTFB {timings["ttfb"] * 1000:.0f} ms, '
+                               f'download {timings.get("download", 0.0) * 1000:.0f} ms, parse {timings["parse"] * 1000:.1f} ms)'))
+                
+                if attempt > 0:
+                    kept = [name for name in FIELD_PLACEHOLDERS if name not in needed]
+                    if kept:
+                        log_queue.put(('info', f'ASIN {asin}: Keeping {", ".join(kept)} from earlier attempts'))
+                
+                if 'title' in needed and fields['title'] is not None:
+                    product_details['title'] = fields['title']
+                    log_queue.put(('info', f'ASIN {asin}: Found title: {product_details["title"][:30]}...'))
+                
+                if 'price' in needed and fields['price'] is not None:
+                    product_details['price'] = fields['price']
+                    log_queue.put(('info', f'ASIN {asin}: Found price: {product_details["price"]}'))
+                
+                if 'image_url' in needed and fields['image_url'] is not None:
+                    product_details['image_url'] = fields['image_url']
+                    log_queue.put(('success', f'ASIN {asin}: Found image on attempt {attempt+1}'))
+                
+                image_found = product_details['image_url'] != FIELD_PLACEHOLDERS['image_url']
+                if not image_found:
+                    log_queue.put(('warning', f'ASIN {asin}: No image found on attempt {attempt+1}. Will retry.'))
+                    retry_reason = 'no image'
+                    continue
+                
+                if product_details['title'] != FIELD_PLACEHOLDERS['title'] and image_found:
+                    product_details['success'] = True
+                    log_queue.put(('success', f'ASIN {asin}: Successfully found title, price and image!'))
+                    metrics.record_asin(True)
+                    return product_details
+                
+                retry_reason = 'no title'
+            
+            else:
+                log_queue.put(('error', f'ASIN {asin}: Bad status code {response.status_code} on attempt {attempt+1}'))
+                retry_reason = f'status {response.status_code}'
+        
+        except Exception as e:
+            log_queue.put(('error', f'ASIN {asin}: Error on attempt {attempt+1}: {str(e)}'))
+            retry_reason = type(e).__name__
+        
+        finally:
+            metrics.record_attempt(timings, status_code)
+            for phase, seconds in timings.items():
+                product_details['timings'][phase] += seconds
+            if retry_reason and attempt < 2:
+                metrics.record_retry(retry_reason)
+    
+    if not product_details['success']:
+        log_queue.put(('error', f'ASIN {asin}: Failed after 3 attempts'))
+        product_details['error'] = 'Failed to retrieve product data after 3 attempts'
+    
+    metrics.record_asin(False)
+    return product_details
+
+# Function to get product details through the single-flight registry, so an
+# ASIN already being fetched for another job or session is waited on and
+# shared instead of fetched twice. A shared result is copied and marked
+# 'coalesced'. Only calls that look for the same fields the same way are
+# shared: a fetch that skipped the fields its caller already knew is no use
+# to a caller that needs them. The caller's own known values are laid over a
+# shared result.
+def get_coalesced_product_details(asin, log_queue, processing_id, total_count, progress_queue=None, single_flight=None, **fetch_options):
+    if single_flight is None:
+        single_flight = get_default_single_flight()
+    
+    known_fields = fetch_options.get('known_fields') or {}
+    key = (
+        fetch_options.get('base_url', AMAZON_BASE_URL), str(asin),
+        frozenset(name for name in known_fields if name in FIELD_PLACEHOLDERS),
+        getattr(fetch_options.get('parser_backend'), 'name', fetch_options.get('parser_backend', DEFAULT_PARSER_BACKEND)), fetch_options.get('stream', DEFAULT_STREAMING)
+    )
+    product_details, shared = single_flight.do(
+        key,
+        lambda: get_amazon_product_details(asin, log_queue, processing_id, total_count, progress_queue, **fetch_options)
+    )
+    if not shared:
+        return product_details
+    
+    if progress_queue is not None:
+        progress_queue.put((processing_id, total_count))
+    log_queue.put(('info', f'ASIN {asin}: Shared the result of a fetch already in flight for another job ({processing_id}/{total_count})'))
+    product_details = dict(product_details)
+    product_details.update({name: value for name, value in known_fields.items() if name in FIELD_PLACEHOLDERS})
+    product_details['coalesced'] = True
+    return product_details
+
+# Function to fetch many ASINs at once on a bounded worker pool.
+# known_fields optionally maps an ASIN to the fields already known for it,
+# which are then not looked for again (see get_amazon_product_details).
+# Yields the (processing_id, asin, product_details) tuples completed since the
+# previous tick, or an empty list every poll_interval seconds so the caller can
+# drain the queues and refresh the UI while slow requests are still in flight.
+def iter_product_details(asins, log_queue, progress_queue=None, concurrency=DEFAULT_CONCURRENCY, poll_interval=0.5, session_pool=None, rate_limiter=None, parser_backend=DEFAULT_PARSER_BACKEND, stream=DEFAULT_STREAMING, base_url=AMAZON_BASE_URL, metrics=None, single_flight=None, known_fields=None):
+    asins = list(asins)
+    known_fields = known_fields or {}
+    total_count = len(asins)
+    concurrency = max(1, min(int(concurrency), MAX_CONCURRENCY))
+    if session_pool is None:
+        session_pool = get_default_session_pool(concurrency)
+    if rate_limiter is None:
+        rate_limiter = get_default_rate_limiter()
+    if metrics is None:
+        metrics = get_default_fetch_metrics()
+    if single_flight is None:
+        single_flight = get_default_single_flight()
+    fetch_options = {
+        'session_pool': session_pool,
+        'rate_limiter': rate_limiter,
+        'parser_backend': parser_backend,
+        'stream': stream,
+        'base_url': base_url,
+        'metrics': metrics
+    }
+    
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="asin-fetch") as executor:
+        pending = {}
+        for index, asin in enumerate(asins):
+            processing_id = index + 1
+            future = executor.submit(get_coalesced_product_details, asin, log_queue, processing_id, total_count, progress_queue, single_flight,
+                                     known_fields=known_fields.get(asin), **fetch_options)
+            pending[future] = (processing_id, asin)
+        
+        while pending:
+            done, _ = wait(pending, timeout=poll_interval, return_when=FIRST_COMPLETED)
+            completed = []
+            for future in done:
+                processing_id, asin = pending.pop(future)
+                try:
+                    product_details = future.result()
+                except Exception as e:
+                    log_queue.put(('error', f'ASIN {asin}: Worker crashed: {str(e)}'))
+                    product_details = {
+                        'asin': asin,
+                        'title': 'Product information not available',
+                        'price': 'N/A',
+                        'image_url': '',
+                        'success': False,
+                        'retry_count': 0,
+                        'error': str(e)
+                    }
+                completed.append((processing_id, asin, product_details))
+            yield completed
+
+# Function to drain a queue without blocking
+def drain_queue(q):
+    items = []
+    while True:
+        try:
+            items.append(q.get_nowait())
+        except queue.Empty:
+            return items
@@ -0,0 +1,118 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+# Products per grid page. A multiple of 5 and 7, so every page but the last
+# fills whole rows in both the normal and the fullscreen grids.
+GRID_PAGE_SIZE = 350
+
+MAX_CACHED_PAGES = 24
+
+
+# Function to get the number of pages needed for total_rows products
+def page_count(total_rows, page_size=GRID_PAGE_SIZE):
+    return max(1, -(-total_rows // page_size))
+
+
+def page_slice(df, page, page_size=GRID_PAGE_SIZE):
+    return df.iloc[page * page_size:(page + 1) * page_size]
+
+
+# Function to fingerprint the rows of one page, in order, over the columns
+# its tiles are built from. Two pages with the same fingerprint render to
+# the same tiles, whichever filter or sort produced them.
+def page_signature(page_df, columns):
+    columns = [column for column in columns if column in page_df.columns]
+    row_hashes = pd.util.hash_pandas_object(page_df[columns], index=False)
+    return hashlib.sha1(row_hashes.values.tobytes()).hexdigest()
+
+
+# Small LRU of rendered grid pages, filled either on demand or ahead of time
+# on a background thread. The grids ask for the page being shown and then
+# prefetch the pages either side, so Previous/Next usually finds its page
+# already built.
+class GridPageCache:
+    def __init__(self, max_pages=MAX_CACHED_PAGES):
+        self.max_pages = max_pages
+        self._pages = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        self.stats = {'hits': 0, 'misses': 0, 'prefetched': 0}
+
+    def _store(self, key, page):
+        with self._lock:
+            self._pages[key] = page
+            self._pages.move_to_end(key)
+            while len(self._pages) > self.max_pages:
+                self._pages.popitem(last=False)
+
+    # Function to get a page, waiting for its prefetch if one is running and
+    # building it here otherwise
+    def get(self, key, build):
+        with self._lock:
+            if key in self._pages:
+                self._pages.move_to_end(key)
+                self.stats['hits'] += 1
+                return self._pages[key]
+            future = self._pending.get(key)
+
+        if future is not None:
+            try:
+                page = future.result()
+                with self._lock:
+                    self.stats['hits'] += 1
+                return page
+            except Exception:
+                # The prefetch failed; build it here so the error surfaces
+                pass
+
+        page = build()
+        self._store(key, page)
+        with self._lock:
+            self.stats['misses'] += 1
+        return page
+
+    # Function to start building a page in the background unless it is
+    # already cached or on its way. Returns straight away.
+    def prefetch(self, key, build):
+        with self._lock:
+            if key in self._pages or key in self._pending:
+                return False
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='grid-prefetch')
+            self._pending[key] = self._executor.submit(self._prefetch, key, build)
+            return True
+
+    def _prefetch(self, key, build):
+        try:
+            page = build()
+            self._store(key, page)
+            with self._lock:
+                self.stats['prefetched'] += 1
+            return page
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+    def report(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['cached'] = len(self._pages)
+            stats['pending'] = len(self._pending)
+        return stats
+
+
+_default_grid_page_cache = None
+_default_grid_page_cache_lock = threading.Lock()
+
+# Function to get the process-wide grid page cache
+def get_default_grid_page_cache():
+    global _default_grid_page_cache
+    with _default_grid_page_cache_lock:
+        if _default_grid_page_cache is None:
+            _default_grid_page_cache = GridPageCache()
+        return _default_grid_page_cache
@@ -0,0 +1,64 @@
+import threading
+from collections import OrderedDict
+
+# Rendered tiles kept across reruns. A tile is a few hundred bytes, so this
+# is a few tens of MB at most.
+MAX_CACHED_TILES = 100000
+
+
+# LRU of rendered grid tile fragments, keyed by tile kind plus everything
+# that goes into the tile's markup (image URL, ASIN, whether a local
+# thumbnail exists). A product's tile is rendered once and reused by every
+# later rerun, page and sort order it shows up in, so building a page comes
+# down to dictionary lookups and a join.
+class TileFragmentCache:
+    def __init__(self, max_tiles=MAX_CACHED_TILES):
+        self.max_tiles = max_tiles
+        self._tiles = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'rendered': 0}
+
+    # Function to get the fragments for rows (a list of tuples of tile
+    # content) in order, rendering any that aren't cached with render(*row)
+    def render_all(self, kind, rows, render):
+        with self._lock:
+            fragments = []
+            for row in rows:
+                key = (kind, row)
+                fragment = self._tiles.get(key)
+                if fragment is not None:
+                    self._tiles.move_to_end(key)
+                fragments.append(fragment)
+
+        rendered = {}
+        for index, fragment in enumerate(fragments):
+            if fragment is None:
+                fragment = render(*rows[index])
+                fragments[index] = fragment
+                rendered[(kind, rows[index])] = fragment
+
+        with self._lock:
+            self.stats['hits'] += len(fragments) - len(rendered)
+            self.stats['rendered'] += len(rendered)
+            self._tiles.update(rendered)
+            while len(self._tiles) > self.max_tiles:
+                self._tiles.popitem(last=False)
+        return fragments
+
+    def report(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['cached'] = len(self._tiles)
+        return stats
+
+
+_default_tile_cache = None
+_default_tile_cache_lock = threading.Lock()
+
+# Function to get the process-wide tile fragment cache
+def get_default_tile_cache():
+    global _default_tile_cache
+    with _default_tile_cache_lock:
+        if _default_tile_cache is None:
+            _default_tile_cache = TileFragmentCache()
+        return _default_tile_cache
@@ -0,0 +1,383 @@
+import queue
+import threading
+import time
+
+import pandas as pd
+
+from fetcher import DEFAULT_CONCURRENCY, FIELD_PLACEHOLDERS, iter_product_details, drain_queue, get_default_session_pool
+from rate_limiter import get_default_rate_limiter
+from product_cache import CACHE_HIT, CACHE_MISS, CACHE_EXPIRED, get_default_product_cache
+from job_store import JOB_RUNNING, JOB_COMPLETE, get_default_job_store, make_job_id
+from work_queue import iter_sharded_product_details
+from thumbnails import get_default_thumbnail_pipeline
+from prices import add_price_columns
+from dataset_store import dataset_version
+
+JOB_QUEUED = 'queued'
+JOB_FAILED = 'failed'
+
+# Finished jobs hold their upload, results and logs, so the registry only
+# keeps this many of them, and none for longer than this many seconds
+MAX_FINISHED_JOBS = 20
+FINISHED_JOB_SECONDS = 3600
+
+
+# Function to fall back on an ASIN's still-fresh cached fields when the
+# refetch of its expired ones failed. Only the expired fields are reported
+# missing; the result is marked 'refresh_failed' so it is neither cached nor
+# resumed from a checkpoint, and the expired fields get another try next run.
+def keep_fresh_fields(product_details, fresh_fields, expired_fields):
+    product_details = dict(product_details)
+    product_details.update({name: value for name, value in fresh_fields.items() if name in FIELD_PLACEHOLDERS})
+    for name in expired_fields:
+        product_details[name] = FIELD_PLACEHOLDERS[name]
+    product_details['success'] = all(
+        product_details[name] != FIELD_PLACEHOLDERS[name] for name in ('title', 'image_url')
+    )
+    if product_details['success']:
+        product_details['error'] = f"Could not refresh {', '.join(expired_fields)}: {product_details.get('error')}"
+        product_details['refresh_failed'] = True
+    return product_details
+
+
+# Function to build the enriched DataFrame from the uploaded rows and the
+# product_details collected so far, keyed by ASIN. Rows whose ASIN has no
+# details yet get a placeholder carrying missing_error.
+def build_enriched_df(df, all_product_details, missing_error='Processing skipped'):
+    enriched_data = []
+
+    for _, row in df.iterrows():
+        asin = row['Asin']
+        product_info = all_product_details.get(asin, {
+            'asin': asin,
+            'title': 'Product information not available',
+            'price': 'N/A',
+            'image_url': '',
+            'success': False,
+            'error': missing_error
+        })
+
+        new_row = row.to_dict()
+        new_row.update({
+            'Product_Title': product_info['title'],
+            'Product_Price': product_info['price'],
+            'Product_Image_URL': product_info['image_url'],
+            'Product_Description': 'N/A',
+            'Product_Rating': 'N/A',
+            'Fetch_Success': product_info['success'],
+            'Product_Link': f"https://www.amazon.com/dp/{asin}",
+            'Error': product_info.get('error', None)
+        })
+
+        enriched_data.append(new_row)
+
+    # Parsed once here so the grid filters and sorts never touch the price text
+    return add_price_columns(pd.DataFrame(enriched_data))
+
+
+# One Amazon enrichment run over an uploaded DataFrame (with its ASIN column
+# already renamed to 'Asin'). It runs on its own thread, so it never touches
+# st.session_state: the UI polls status, progress and logs and can ask for a
+# partial DataFrame at any time.
+class EnrichmentJob:
+    # workers > 0 hands the fetching to that many shard_worker.py processes
+    # over the work queue instead of threads in this process.
+    def __init__(self, df, concurrency=DEFAULT_CONCURRENCY, use_cache=True, workers=0):
+        self.df = df
+        self.unique_asins = list(df['Asin'].unique())
+        # Keyed on the whole upload and the options, so only a resubmission of
+        # the same job is deduplicated; other jobs with the same ASINs share
+        # their fetches through the single-flight registry and the cache
+        self.job_id = make_job_id(self.unique_asins, (dataset_version(df), concurrency, use_cache, workers))
+        self.concurrency = concurrency
+        self.use_cache = use_cache
+        self.workers = workers
+
+        self.status = JOB_QUEUED
+        self.error = None
+        self.logs = []
+        self.product_details = {}
+        self.failed_asins = []
+        self.result = None
+        self.fetch_total = 0
+        self.current_processing_id = 0
+        self.rate = None
+        self.created_at = time.time()
+        self.finished_at = None
+        # Sessions that submitted this job; see JobRegistry.jobs
+        self.session_ids = set()
+        self.thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def total(self):
+        return len(self.unique_asins)
+
+    @property
+    def completed_count(self):
+        with self._lock:
+            return len(self.product_details)
+
+    @property
+    def done(self):
+        return self.status in (JOB_COMPLETE, JOB_FAILED)
+
+    # Function to add a log message, timestamped the same way as add_log
+    def log(self, message, level="info"):
+        timestamp = time.strftime("%H:%M:%S", time.localtime())
+        with self._lock:
+            self.logs.append((level, f"[{timestamp}] {message}"))
+
+    def get_logs(self):
+        with self._lock:
+            return list(self.logs)
+
+    # Function to get the enriched DataFrame for whatever has finished so far
+    def partial_dataframe(self):
+        with self._lock:
+            all_product_details = dict(self.product_details)
+        return build_enriched_df(self.df, all_product_details, missing_error='Not fetched yet')
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name=f"enrichment-job-{self.job_id}", daemon=True)
+        self.thread.start()
+
+    def run(self):
+        self.status = JOB_RUNNING
+        try:
+            self._run()
+        except Exception as e:
+            self.error = str(e)
+            self.status = JOB_FAILED
+            self.log(f"Job {self.job_id}: failed: {str(e)}", "error")
+        finally:
+            self.finished_at = time.time()
+
+    def _store(self, asin, product_details):
+        with self._lock:
+            self.product_details[asin] = product_details
+
+    def _run(self):
+        total_asins = self.total
+        self.log(f"Starting processing of {total_asins} unique ASINs")
+
+        log_queue = queue.Queue()
+        progress_queue = queue.Queue()
+
+        def flush_logs():
+            for level, message in drain_queue(log_queue):
+                with self._lock:
+                    self.logs.append((level, message))
+
+        asins_to_fetch = []
+        # Fresh cached fields of ASINs with some expired fields, and the
+        # expired fields to refetch, so only those are looked for and cached
+        known_fields = {}
+        expired_fields = {}
+        cache_counts = {CACHE_HIT: 0, CACHE_MISS: 0, CACHE_EXPIRED: 0}
+        product_cache = get_default_product_cache() if self.use_cache else None
+
+        # Resume from the checkpoint of an earlier run of the same upload. Only
+        # successful results are reused; failures get another try.
+        job_store = get_default_job_store()
+        checkpoint = job_store.open_job(self.job_id, total_asins)
+        for asin in self.unique_asins:
+            checkpointed_details = checkpoint.get(str(asin))
+            if checkpointed_details is not None and checkpointed_details['success'] and not checkpointed_details.get('refresh_failed'):
+                self._store(asin, checkpointed_details)
+
+        resumed_count = self.completed_count
+        if resumed_count:
+            self.log(f"Job {self.job_id}: resuming from checkpoint with {resumed_count} of {total_asins} ASINs already done", "success")
+        else:
+            self.log(f"Job {self.job_id}: starting")
+
+        for asin in self.unique_asins:
+            if asin in self.product_details:
+                continue
+            if product_cache is None:
+                asins_to_fetch.append(asin)
+                continue
+            cached_details, cache_status, stale_fields = product_cache.get(asin)
+            cache_counts[cache_status] += 1
+            if cache_status == CACHE_HIT:
+                self._store(asin, cached_details)
+                continue
+            if cache_status == CACHE_EXPIRED:
+                known_fields[asin] = cached_details
+                expired_fields[asin] = stale_fields
+            asins_to_fetch.append(asin)
+
+        if product_cache is not None:
+            looked_up = sum(cache_counts.values())
+            hit_rate = cache_counts[CACHE_HIT] / looked_up if looked_up else 0.0
+            self.log(
+                f"Cache: {cache_counts[CACHE_HIT]} hits, {cache_counts[CACHE_MISS]} misses, "
+                f"{cache_counts[CACHE_EXPIRED]} expired (hit rate {hit_rate:.0%}) - fetching {len(asins_to_fetch)} ASINs, "
+                f"{len(known_fields)} of them only for their expired fields",
+                "success" if cache_counts[CACHE_HIT] else "info"
+            )
+
+        self.fetch_total = len(asins_to_fetch)
+        self.log(f"Fetching with {self.concurrency} concurrent workers")
+
+        # The pool and the rate limiter are shared with any other running job,
+        # so the pool report is taken relative to a baseline instead of reset.
+        session_pool = get_default_session_pool(self.concurrency)
+        pool_baseline = session_pool.report()
+        rate_limiter = get_default_rate_limiter()
+        # Cached and checkpointed products need thumbnails too
+        thumbnail_pipeline = get_default_thumbnail_pipeline()
+        thumbnail_pipeline.ensure(details['image_url'] for details in list(self.product_details.values()))
+        self.rate = rate_limiter.rate
+        self.log(f"Rate limiter starting at {rate_limiter.rate:.2f} req/s")
+
+        # Shard workers are separate processes with their own session pools
+        # and rate limiters; they split this limiter's rate between them
+        sharded = bool(self.workers and asins_to_fetch)
+        if sharded:
+            fetched = iter_sharded_product_details(self.job_id, asins_to_fetch, log_queue, self.workers, self.concurrency,
+                                                   known_fields={str(asin): fields for asin, fields in known_fields.items()},
+                                                   rate=rate_limiter.rate, max_rate=rate_limiter.max_rate)
+        else:
+            fetched = iter_product_details(asins_to_fetch, log_queue, progress_queue, self.concurrency, session_pool=session_pool,
+                                           rate_limiter=rate_limiter, known_fields=known_fields)
+        
+        for completed in fetched:
+            if known_fields:
+                completed = [
+                    (processing_id, asin, keep_fresh_fields(product_details, known_fields[asin], expired_fields[asin]))
+                    if not product_details['success'] and asin in known_fields else (processing_id, asin, product_details)
+                    for processing_id, asin, product_details in completed
+                ]
+            for processing_id, asin, product_details in completed:
+                self.current_processing_id = max(self.current_processing_id, processing_id)
+                self._store(asin, product_details)
+                if product_cache is not None and not product_details.get('refresh_failed'):
+                    product_cache.put(asin, product_details, expired_fields.get(asin))
+            job_store.checkpoint(self.job_id, [(asin, product_details) for _, asin, product_details in completed])
+            # Start on thumbnails while the rest of the job is still fetching
+            thumbnail_pipeline.ensure(product_details['image_url'] for _, _, product_details in completed)
+
+            for processing_id, total_count in drain_queue(progress_queue):
+                self.current_processing_id = max(self.current_processing_id, processing_id)
+            self.rate = rate_limiter.rate
+            flush_logs()
+
+        coalesced_count = sum(
+            1 for asin in asins_to_fetch
+            if asin in self.product_details and self.product_details[asin].get('coalesced')
+        )
+        if coalesced_count:
+            self.log(f"Single-flight: {coalesced_count} of {len(asins_to_fetch)} ASINs shared a fetch already in flight for another job", "success")
+        
+        parsed_details = [
+            self.product_details[asin] for asin in asins_to_fetch
+            if asin in self.product_details and self.product_details[asin].get('parse_path')
+            and not self.product_details[asin].get('coalesced')
+        ]
+        if parsed_details:
+            fast_count = sum(1 for details in parsed_details if details['parse_path'] == 'fast')
+            self.log(f"Fast path: {fast_count} of {len(parsed_details)} pages parsed without a DOM ({fast_count / len(parsed_details):.0%} hit rate)")
+
+            early_count = sum(1 for details in parsed_details if details.get('stopped_early'))
+            downloaded_bytes = sum(details.get('bytes_downloaded') or 0 for details in parsed_details)
+            saved_bytes = sum(details.get('bytes_saved') or 0 for details in parsed_details)
+            unknown_count = sum(1 for details in parsed_details if details.get('bytes_saved') is None)
+            self.log(
+                f"Streaming: {early_count} of {len(parsed_details)} downloads stopped early, "
+                f"{downloaded_bytes / 1048576:.1f} MB downloaded, {saved_bytes / 1048576:.1f} MB saved"
+                + (f" (size unknown for {unknown_count} chunked responses)" if unknown_count else "")
+            )
+
+        # This process's pool made none of a sharded job's requests
+        if not sharded:
+            pool_stats = session_pool.report(since=pool_baseline)
+            self.log(
+                f"Session pool: {pool_stats['requests']} requests, {pool_stats['reused_connections']} on reused connections "
+                f"({pool_stats['reuse_rate']:.0%}), {pool_stats['new_connections']} new connections, "
+                f"~{pool_stats['handshake_seconds_saved']:.1f}s handshake time saved, "
+                f"{pool_stats['rotations_max_requests'] + pool_stats['rotations_blocked']} session rotations "
+                f"({pool_stats['rotations_blocked']} after blocks)"
+            )
+
+        job_store.complete_job(self.job_id)
+        self.log(f"Job {self.job_id}: complete")
+
+        # Keep the failed list in upload order so it matches a serial run
+        failed_asins = []
+        for asin in self.unique_asins:
+            product_details = self.product_details.get(asin)
+            if product_details is None or not product_details['success'] or not product_details['image_url']:
+                failed_asins.append(asin)
+
+        self.failed_asins = failed_asins
+        self.result = build_enriched_df(self.df, self.product_details)
+        self.status = JOB_COMPLETE
+
+
+# Process-wide registry of enrichment jobs. Jobs outlive the script run that
+# started them, so a rerun, a tab switch or a reloaded page can find a job
+# again by its ID and keep polling it. Finished jobs are dropped once there
+# are more than max_finished_jobs of them or they are older than
+# finished_job_seconds; running jobs are always kept.
+class JobRegistry:
+    def __init__(self, max_finished_jobs=MAX_FINISHED_JOBS, finished_job_seconds=FINISHED_JOB_SECONDS):
+        self.max_finished_jobs = max_finished_jobs
+        self.finished_job_seconds = finished_job_seconds
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    # Function to drop expired finished jobs and then the oldest ones over
+    # the cap. Called with the lock held.
+    def _evict(self, now=None):
+        now = time.time() if now is None else now
+        finished = sorted(
+            (job for job in self._jobs.values() if job.done and job.finished_at is not None),
+            key=lambda job: job.finished_at
+        )
+        excess = len(finished) - self.max_finished_jobs
+        for index, job in enumerate(finished):
+            if index < excess or now - job.finished_at > self.finished_job_seconds:
+                del self._jobs[job.job_id]
+
+    # Function to start a job for an upload on behalf of session_id. If the
+    # same upload is already being processed, the running job is returned
+    # instead of a second one, and is listed for this session too.
+    def submit(self, df, concurrency=DEFAULT_CONCURRENCY, use_cache=True, workers=0, session_id=None):
+        job = EnrichmentJob(df, concurrency, use_cache, workers)
+        with self._lock:
+            self._evict()
+            existing = self._jobs.get(job.job_id)
+            if existing is not None and not existing.done:
+                existing.session_ids.add(session_id)
+                return existing
+            job.session_ids.add(session_id)
+            self._jobs[job.job_id] = job
+        job.start()
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            self._evict()
+            return self._jobs.get(job_id)
+
+    # Function to list the jobs submitted by session_id (every job if it is
+    # None), newest first
+    def jobs(self, session_id=None):
+        with self._lock:
+            self._evict()
+            jobs = [job for job in self._jobs.values() if session_id is None or session_id in job.session_ids]
+        return sorted(jobs, key=lambda job: job.created_at, reverse=True)
+
+
+_default_job_registry = None
+_default_job_registry_lock = threading.Lock()
+
+# Function to get the process-wide job registry
+def get_default_job_registry():
+    global _default_job_registry
+    with _default_job_registry_lock:
+        if _default_job_registry is None:
+            _default_job_registry = JobRegistry()
+        return _default_job_registry
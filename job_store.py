@@ -0,0 +1,126 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_JOB_STORE_PATH = os.environ.get('JOB_STORE_PATH', os.path.join('.cache', 'jobs.sqlite3'))
+
+JOB_RUNNING = 'running'
+JOB_COMPLETE = 'complete'
+
+
+# Function to derive a job ID from the ASINs being enriched and a fingerprint
+# of everything else that shapes the job (the uploaded rows, the fetch
+# options). The same upload always maps to the same job, so re-uploading a
+# file after a crash finds the checkpoint left by the earlier run, while a
+# different file that happens to hold the same ASINs gets a job of its own.
+def make_job_id(asins, fingerprint=''):
+    digest = hashlib.sha1()
+    for asin in asins:
+        digest.update(str(asin).encode('utf-8'))
+        digest.update(b'\n')
+    digest.update(str(fingerprint).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+# Checkpoints for enrichment jobs. Every product_details dict is written as
+# soon as its ASIN finishes, so a restarted process or reloaded tab can resume
+# from where the last run stopped instead of fetching everything again.
+class JobStore:
+    def __init__(self, path=DEFAULT_JOB_STORE_PATH):
+        self.path = path
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Same threading arrangement as ProductCache: one connection shared
+        # across Streamlit's script threads, serialised with a lock.
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                total INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS job_results (
+                job_id TEXT NOT NULL,
+                asin TEXT NOT NULL,
+                details TEXT NOT NULL,
+                completed_at REAL NOT NULL,
+                PRIMARY KEY (job_id, asin)
+            )
+        """)
+        self._conn.commit()
+
+    # Function to start or resume a job. Returns the product_details dicts
+    # checkpointed by an unfinished earlier run, keyed by ASIN; a job that
+    # already completed is started over with an empty checkpoint.
+    def open_job(self, job_id, total, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            row = self._conn.execute('SELECT status FROM jobs WHERE job_id = ?', (job_id,)).fetchone()
+            if row is not None and row[0] == JOB_RUNNING:
+                self._conn.execute('UPDATE jobs SET total = ?, updated_at = ? WHERE job_id = ?', (total, now, job_id))
+                rows = self._conn.execute(
+                    'SELECT asin, details FROM job_results WHERE job_id = ?',
+                    (job_id,)
+                ).fetchall()
+            else:
+                self._conn.execute('DELETE FROM job_results WHERE job_id = ?', (job_id,))
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO jobs (job_id, status, total, created_at, updated_at) VALUES (?, ?, ?, ?, ?)',
+                    (job_id, JOB_RUNNING, total, now, now)
+                )
+                rows = []
+            self._conn.commit()
+
+        return {asin: json.loads(details) for asin, details in rows}
+
+    # Function to checkpoint a batch of finished ASINs in one transaction.
+    # results is an iterable of (asin, product_details).
+    def checkpoint(self, job_id, results, now=None):
+        now = time.time() if now is None else now
+        rows = [(job_id, str(asin), json.dumps(details), now) for asin, details in results]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO job_results (job_id, asin, details, completed_at) VALUES (?, ?, ?, ?)',
+                rows
+            )
+            self._conn.execute('UPDATE jobs SET updated_at = ? WHERE job_id = ?', (now, job_id))
+            self._conn.commit()
+
+    def complete_job(self, job_id, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            self._conn.execute(
+                'UPDATE jobs SET status = ?, updated_at = ? WHERE job_id = ?',
+                (JOB_COMPLETE, now, job_id)
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_default_job_store = None
+_default_job_store_lock = threading.Lock()
+
+# Function to get the process-wide job store, opened on first use
+def get_default_job_store():
+    global _default_job_store
+    with _default_job_store_lock:
+        if _default_job_store is None:
+            _default_job_store = JobStore()
+        return _default_job_store
@@ -0,0 +1,670 @@
+import html as html_lib
+import importlib.util
+import json
+import re
+import sys
+import time
+
+from bs4 import BeautifulSoup, Tag
+
+HAS_LXML = importlib.util.find_spec('lxml') is not None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+    HAS_SELECTOLAX = True
+except ImportError:
+    HAS_SELECTOLAX = False
+
+TITLE_SELECTOR = '#productTitle'
+
+PRICE_SELECTORS = [
+    '.a-price .a-offscreen',
+    '#priceblock_ourprice',
+    '#priceblock_dealprice',
+    '.a-color-price',
+    '#price_inside_buybox',
+    '.priceToPay span.a-offscreen'
+]
+
+IMAGE_SELECTORS = [
+    '#landingImage',
+    '#imgBlkFront',
+    '#ebooksImgBlkFront',
+    '#img-wrapper img',
+    '.a-dynamic-image',
+    '#main-image',
+    'img[data-old-hires]',
+    'img[data-a-dynamic-image]',
+    '.imageThumb img',
+    '#imageBlock img',
+    '#imgTagWrapperId img',
+    '.image-wrapper img',
+    'img.a-dynamic-image'
+]
+
+IMAGE_ATTRIBUTES = ['src', 'data-old-hires', 'data-a-dynamic-image']
+
+# The title, price and image all live in the product block at the top of the
+# page (image block on the left, title and price in the centre, buybox on the
+# right). Everything after these markers is reviews, A+ content and
+# recommendation carousels, which is most of the page's bytes.
+REGION_START_MARKERS = ['id="dp-container"', 'id="ppd"', 'id="leftCol"', 'id="imageBlock"', 'id="centerCol"']
+REGION_END_MARKERS = [
+    'id="aplus_feature_div"',
+    'id="aplus"',
+    'id="similarities_feature_div"',
+    'id="reviewsMedley"',
+    'id="customerReviews"',
+    'id="dp-ads-center-promo_feature_div"'
+]
+
+
+FULL_SIZE_IMAGE_WIDTH = 1500
+
+# Amazon image CDN URLs; only these understand the ._AC_SL<width>_ size token
+AMAZON_IMAGE_URL_PATTERN = re.compile(r'https?://[^/]*(?:media-amazon|images-amazon)\.com/images/')
+
+
+# Function to turn an Amazon image URL into the full-size variant
+def normalize_image_url(image_url):
+    if '._' in image_url:
+        base_image_url = image_url.split('._')[0]
+        image_url = base_image_url + f"._AC_SL{FULL_SIZE_IMAGE_WIDTH}_.jpg"
+    return image_url
+
+
+# Function to get the variant of an Amazon image scaled so its longest side
+# is width pixels, by swapping the size token in the URL. Anything that isn't
+# an Amazon image URL comes back unchanged.
+def amazon_image_variant(image_url, width):
+    if not image_url or not AMAZON_IMAGE_URL_PATTERN.match(image_url):
+        return image_url
+    if '._' in image_url:
+        base_image_url = image_url.split('._')[0]
+    else:
+        base_image_url = image_url.rsplit('.', 1)[0]
+    return base_image_url + f"._AC_SL{width}_.jpg"
+
+
+# Function to locate the product block. Returns (start, end) offsets, with
+# end None when no end marker follows the block (yet), or None when the page
+# has no recognisable product block at all.
+def find_product_region(html):
+    starts = [html.find(marker) for marker in REGION_START_MARKERS]
+    starts = [index for index in starts if index != -1]
+    if not starts:
+        return None
+    start = html.rfind('<', 0, min(starts))
+    if start == -1:
+        return None
+
+    ends = [html.find(marker, start) for marker in REGION_END_MARKERS]
+    ends = [index for index in ends if index != -1]
+    if not ends:
+        return start, None
+    end = html.rfind('<', start, min(ends))
+    return start, (end if end > start else None)
+
+
+# Function to cut a product page down to the product block. Returns the full
+# page when the markers are not found, so unusual layouts still parse.
+def slice_product_regions(html):
+    region = find_product_region(html)
+    if region is None:
+        return html
+    start, end = region
+    return html[start:end] if end is not None else html[start:]
+
+
+# Function to tell whether a partially downloaded page already contains the
+# whole product block, so nothing later in the page can change the fields
+def product_region_complete(html):
+    region = find_product_region(html)
+    return region is not None and region[1] is not None
+
+
+# BeautifulSoup backend, used with the stdlib html.parser or with lxml as
+# the tree builder
+class SoupBackend:
+    native_selectors = False
+
+    def __init__(self, features='html.parser'):
+        self.name = features
+        self.features = features
+
+    def parse(self, html):
+        return BeautifulSoup(html, self.features)
+
+    def select_one(self, document, selector):
+        return document.select_one(selector)
+
+    def select(self, document, selector):
+        return document.select(selector)
+
+    def children(self, node):
+        return [child for child in node.contents if isinstance(child, Tag)]
+
+    def tag(self, node):
+        return node.name
+
+    def classes(self, node):
+        return set(node.get('class') or ())
+
+    def text(self, node):
+        return node.get_text()
+
+    def attr(self, node, name):
+        return node.get(name)
+
+
+# selectolax (Lexbor) backend, a C parser with its own CSS engine
+class SelectolaxBackend:
+    name = 'selectolax'
+    native_selectors = True
+
+    def parse(self, html):
+        return LexborHTMLParser(html)
+
+    def select_one(self, document, selector):
+        return document.css_first(selector)
+
+    def select(self, document, selector):
+        return document.css(selector)
+
+    def children(self, node):
+        if node is None:
+            return []
+        if isinstance(node, LexborHTMLParser):
+            return [node.root] if node.root is not None else []
+        return list(node.iter())
+
+    def tag(self, node):
+        return node.tag
+
+    def classes(self, node):
+        return set((node.attributes.get('class') or '').split())
+
+    def text(self, node):
+        return node.text(deep=True)
+
+    def attr(self, node, name):
+        return node.attributes.get(name)
+
+
+PARSER_BACKENDS = {'html.parser': lambda: SoupBackend('html.parser')}
+if HAS_LXML:
+    PARSER_BACKENDS['lxml'] = lambda: SoupBackend('lxml')
+if HAS_SELECTOLAX:
+    PARSER_BACKENDS['selectolax'] = SelectolaxBackend
+
+DEFAULT_PARSER_BACKEND = 'auto'
+
+
+# Function to pick a parser backend by name. 'auto' takes the fastest one
+# that is installed.
+def get_parser_backend(name=DEFAULT_PARSER_BACKEND):
+    if name == 'auto':
+        for candidate in ['selectolax', 'lxml', 'html.parser']:
+            if candidate in PARSER_BACKENDS:
+                return PARSER_BACKENDS[candidate]()
+    if name not in PARSER_BACKENDS:
+        raise ValueError(f"Unknown or unavailable parser backend '{name}'. Available: {list(PARSER_BACKENDS)}")
+    return PARSER_BACKENDS[name]()
+
+
+COMPOUND_PATTERN = re.compile(r'^(?P<tag>[a-zA-Z][\w-]*)?(?P<rest>(?:[#.][\w-]+|\[[\w-]+\])*)$')
+COMPOUND_PART_PATTERN = re.compile(r'#[\w-]+|\.[\w-]+|\[[\w-]+\]')
+
+
+# Function to compile one compound selector ('img.a-dynamic-image',
+# '#landingImage', 'img[data-old-hires]') into the tag, id, classes and
+# attribute names an element must have. Returns None for anything else.
+def compile_compound(compound):
+    match = COMPOUND_PATTERN.match(compound)
+    if not match or not compound:
+        return None
+    requirements = {'tag': match.group('tag'), 'id': None, 'classes': frozenset(), 'attrs': ()}
+    classes = []
+    attrs = []
+    for part in COMPOUND_PART_PATTERN.findall(match.group('rest')):
+        if part.startswith('#'):
+            requirements['id'] = part[1:]
+        elif part.startswith('.'):
+            classes.append(part[1:])
+        else:
+            attrs.append(part[1:-1])
+    requirements['classes'] = frozenset(classes)
+    requirements['attrs'] = tuple(attrs)
+    return requirements
+
+
+# Function to compile a selector made of compounds joined by descendant
+# combinators ('#imageBlock img') into a chain of compounds
+def compile_selector(selector):
+    chain = [compile_compound(compound) for compound in selector.split()]
+    if not chain or any(step is None for step in chain):
+        return None
+    return chain
+
+
+# A compiled extraction plan. Instead of one tree walk per selector (up to
+# 20 per page), the title, price and image selectors are all evaluated in a
+# single depth-first traversal. Each selector is compiled into a chain of
+# compounds that are indexed by id, class and tag, so an element is only
+# checked against the handful of compounds it could satisfy. Descendant
+# combinators are resolved with per-chain counters of open ancestors, so no
+# element ever walks back up the tree.
+#
+# Candidates are recorded per selector in document order and the existing
+# priority order is applied to them. Selectors stop collecting once that
+# priority makes them irrelevant: the title and each price selector only
+# ever use their first match, and once an image selector produces a URL every
+# lower-priority image selector is closed. The walk ends as soon as nothing
+# is left open.
+class ExtractionPlan:
+    def __init__(self, title_selector=TITLE_SELECTOR, price_selectors=PRICE_SELECTORS, image_selectors=IMAGE_SELECTORS):
+        self.title_selector = title_selector
+        self.price_selectors = list(price_selectors)
+        self.image_selectors = list(image_selectors)
+        self.selectors = list(dict.fromkeys([title_selector] + self.price_selectors + self.image_selectors))
+        self.chains = {}
+        self.fallback_selectors = []
+        for selector in self.selectors:
+            chain = compile_selector(selector)
+            if chain is None:
+                self.fallback_selectors.append(selector)
+            else:
+                self.chains[selector] = chain
+
+        # (selector, step) entries bucketed by the most selective key of
+        # their compound
+        self.by_id = {}
+        self.by_class = {}
+        self.by_tag = {}
+        self.universal = []
+        for selector, chain in self.chains.items():
+            for step, compound in enumerate(chain):
+                entry = (selector, step, compound, step == len(chain) - 1)
+                if compound['id']:
+                    self.by_id.setdefault(compound['id'], []).append(entry)
+                elif compound['classes']:
+                    self.by_class.setdefault(min(compound['classes']), []).append(entry)
+                elif compound['tag']:
+                    self.by_tag.setdefault(compound['tag'], []).append(entry)
+                else:
+                    self.universal.append(entry)
+
+    def _entries_for(self, backend, node):
+        entries = []
+        node_id = backend.attr(node, 'id')
+        if node_id and node_id in self.by_id:
+            entries.extend(self.by_id[node_id])
+        classes = backend.classes(node)
+        for class_name in classes:
+            if class_name in self.by_class:
+                entries.extend(self.by_class[class_name])
+        tag = backend.tag(node)
+        if tag in self.by_tag:
+            entries.extend(self.by_tag[tag])
+        entries.extend(self.universal)
+        return entries, node_id, classes, tag
+
+    # Function for backends whose selector engine is native code, where one
+    # C-level walk per selector is cheaper than any walk driven from Python
+    def _extract_native(self, backend, document):
+        fields = {'title': None, 'price': None, 'image_url': None}
+
+        title_element = backend.select_one(document, self.title_selector)
+        if title_element is not None:
+            fields['title'] = backend.text(title_element).strip()
+
+        for selector in self.price_selectors:
+            price_element = backend.select_one(document, selector)
+            if price_element is not None and backend.text(price_element).strip():
+                fields['price'] = backend.text(price_element).strip()
+                break
+
+        for selector in self.image_selectors:
+            image_url = _image_url_from_candidates(backend, backend.select(document, selector))
+            if image_url is not None:
+                fields['image_url'] = image_url
+                break
+
+        return fields
+
+    def extract(self, backend, document):
+        if backend.native_selectors:
+            return self._extract_native(backend, document)
+
+        fields = {'title': None, 'price': None, 'image_url': None}
+
+        open_selectors = set(self.selectors)
+        price_rank = {selector: rank for rank, selector in enumerate(self.price_selectors)}
+        image_rank = {selector: rank for rank, selector in enumerate(self.image_selectors)}
+        price_candidates = {}
+        image_winner = [None]
+
+        # open_ancestors[(selector, step)] counts the open elements matching
+        # that non-final step of the chain
+        open_ancestors = {}
+
+        def record(selector, node):
+            if selector == self.title_selector:
+                fields['title'] = backend.text(node).strip()
+                open_selectors.discard(selector)
+
+            if selector in price_rank:
+                price_text = backend.text(node).strip()
+                price_candidates[selector] = price_text
+                open_selectors.discard(selector)
+                if price_text:
+                    open_selectors.difference_update(self.price_selectors[price_rank[selector] + 1:])
+
+            if selector in image_rank:
+                image_url = _image_url_from_candidates(backend, [node])
+                if image_url is not None:
+                    rank = image_rank[selector]
+                    if image_winner[0] is None or rank < image_winner[0][0]:
+                        image_winner[0] = (rank, image_url)
+                    open_selectors.difference_update(self.image_selectors[rank:])
+
+        for selector in self.fallback_selectors:
+            for node in backend.select(document, selector):
+                if selector not in open_selectors:
+                    break
+                record(selector, node)
+
+        # Iterative depth-first walk; None on the stack marks leaving an
+        # element so its ancestor counters can be released
+        stack = list(reversed(backend.children(document)))
+        exits = []
+        while stack and open_selectors:
+            node = stack.pop()
+            if node is None:
+                for key in exits.pop():
+                    open_ancestors[key] -= 1
+                continue
+
+            entries, node_id, classes, tag = self._entries_for(backend, node)
+            entered = []
+            for selector, step, compound, is_final in entries:
+                if is_final and selector not in open_selectors:
+                    continue
+                if compound['tag'] and compound['tag'] != tag:
+                    continue
+                if compound['id'] and compound['id'] != node_id:
+                    continue
+                if compound['classes'] and not compound['classes'] <= classes:
+                    continue
+                if compound['attrs'] and any(backend.attr(node, name) is None for name in compound['attrs']):
+                    continue
+                if step > 0 and not open_ancestors.get((selector, step - 1)):
+                    continue
+                if is_final:
+                    record(selector, node)
+                else:
+                    entered.append((selector, step))
+
+            for key in entered:
+                open_ancestors[key] = open_ancestors.get(key, 0) + 1
+
+            children = backend.children(node)
+            if entered:
+                exits.append(entered)
+                stack.append(None)
+            stack.extend(reversed(children))
+
+        for selector in self.price_selectors:
+            if price_candidates.get(selector):
+                fields['price'] = price_candidates[selector]
+                break
+
+        if image_winner[0] is not None:
+            fields['image_url'] = image_winner[0][1]
+
+        return fields
+
+
+# Function to read an image URL from one element's attributes, trying src,
+# data-old-hires and the data-a-dynamic-image size map in that order
+def _image_url_from_attributes(get_attr):
+    for attr in IMAGE_ATTRIBUTES:
+        image_url = get_attr(attr)
+        if not image_url:
+            continue
+
+        if image_url.startswith('{'):
+            try:
+                image_data = json.loads(image_url)
+                if image_data:
+                    image_url = max(image_data.keys(), key=lambda x: image_data[x][0] * image_data[x][1])
+            except Exception:
+                image_url = get_attr('src') or ''
+
+        if image_url:
+            return normalize_image_url(image_url)
+    return None
+
+
+def _image_url_from_candidates(backend, image_elements):
+    for image_element in image_elements:
+        image_url = _image_url_from_attributes(lambda attr: backend.attr(image_element, attr))
+        if image_url is not None:
+            return image_url
+    return None
+
+
+DEFAULT_EXTRACTION_PLAN = ExtractionPlan()
+
+
+# Function to pull the title, price and image URL out of a product page.
+# Fields that are not on the page come back as None. With regions_only the
+# parse is limited to the product block, and only the fields missing there
+# are taken from a parse of the whole page; whatever the product block had
+# is kept, since outside it the same selectors also match carousel and
+# sponsored products.
+def extract_product_fields(html, backend=DEFAULT_PARSER_BACKEND, regions_only=True, plan=DEFAULT_EXTRACTION_PLAN):
+    if isinstance(backend, str):
+        backend = get_parser_backend(backend)
+
+    if regions_only:
+        region_html = slice_product_regions(html)
+        if len(region_html) < len(html):
+            fields = plan.extract(backend, backend.parse(region_html))
+            if any(value is None for value in fields.values()):
+                for name, value in plan.extract(backend, backend.parse(html)).items():
+                    if fields[name] is None:
+                        fields[name] = value
+            return fields
+
+    return plan.extract(backend, backend.parse(html))
+
+
+# Opening tag of an element with the given id, or with the given class among
+# its classes. Group 1 is the tag name. Attribute names have to stand on
+# their own (data-id= is not id=) and classes are matched as whole
+# whitespace-separated tokens, the way the DOM selectors read them.
+def _fast_id_tag(element_id):
+    return r'<(\w+)[^>]*(?<![\w-])id\s*=\s*(["\'])' + re.escape(element_id) + r'\2[^>]*>'
+
+
+def _fast_class_tag(class_name):
+    return r'<(\w+)[^>]*(?<![\w-])class\s*=\s*(["\'])(?:[^"\'>]*\s)?' + re.escape(class_name) + r'(?:\s[^"\'>]*)?\2[^>]*>'
+
+
+FAST_TITLE_TAG_PATTERN = re.compile(_fast_id_tag('productTitle'))
+FAST_PRICE_TAG_PATTERN = re.compile(_fast_class_tag('a-price'))
+FAST_OFFSCREEN_TAG_PATTERN = re.compile(r'\s*' + _fast_class_tag('a-offscreen'))
+FAST_PRICE_BLOCK_TAG_PATTERNS = [
+    re.compile(_fast_id_tag('priceblock_ourprice')),
+    re.compile(_fast_id_tag('priceblock_dealprice'))
+]
+FAST_IMAGE_TAG_PATTERNS = [
+    re.compile(_fast_id_tag('landingImage')),
+    re.compile(_fast_id_tag('imgBlkFront')),
+    re.compile(_fast_id_tag('ebooksImgBlkFront'))
+]
+FAST_ATTRIBUTE_PATTERN = re.compile(r'([\w-]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\')')
+FAST_COLOR_IMAGES_PATTERN = re.compile(r"""['"]colorImages['"]\s*:\s*\{\s*['"]initial['"]\s*:\s*""")
+
+
+def _fast_tag_attributes(tag_html):
+    attributes = {}
+    for name, double_quoted, single_quoted in FAST_ATTRIBUTE_PATTERN.findall(tag_html):
+        value = double_quoted if double_quoted or not single_quoted else single_quoted
+        attributes.setdefault(name.lower(), html_lib.unescape(value))
+    return attributes
+
+
+# Function to read the text of the element whose opening tag is tag_match.
+# Returns None unless the element holds nothing but text.
+def _fast_element_text(html, tag_match):
+    text_match = re.compile(r'([^<]*)</' + tag_match.group(1) + r'\s*>', re.IGNORECASE).match(html, tag_match.end())
+    if text_match is None:
+        return None
+    return html_lib.unescape(text_match.group(1)).strip()
+
+
+# Function to read the price the way the DOM plan would: the first
+# .a-offscreen inside the first .a-price, else the first priceblock span.
+# Only the plain markup of those is read; an .a-price without its offscreen
+# span straight inside, a nested or empty price, or anything else the DOM
+# plan might read differently gives None.
+def _fast_price(html):
+    price_tag = FAST_PRICE_TAG_PATTERN.search(html)
+    if price_tag is not None:
+        offscreen_tag = FAST_OFFSCREEN_TAG_PATTERN.match(html, price_tag.end())
+        if offscreen_tag is None:
+            return None
+        return _fast_element_text(html, offscreen_tag) or None
+
+    for pattern in FAST_PRICE_BLOCK_TAG_PATTERNS:
+        price_block_tag = pattern.search(html)
+        if price_block_tag is not None:
+            return _fast_element_text(html, price_block_tag) or None
+    return None
+
+
+def _fast_color_images_url(html):
+    match = FAST_COLOR_IMAGES_PATTERN.search(html)
+    if not match:
+        return None
+    try:
+        images, _ = json.JSONDecoder().raw_decode(html, match.end())
+    except ValueError:
+        return None
+    for image in images if isinstance(images, list) else []:
+        if isinstance(image, dict):
+            image_url = image.get('hiRes') or image.get('large')
+            if image_url:
+                return normalize_image_url(image_url)
+    return None
+
+
+# Function to read the title, price and hi-res image straight from the raw
+# page text without building a DOM. It looks at the productTitle span, the
+# a-price/priceblock spans, the data-old-hires and data-a-dynamic-image
+# payloads on the main image tag and the colorImages JSON in the image block
+# script. Like the DOM path it only looks inside the product block unless
+# regions_only is off. Anything it can't read unambiguously comes back as
+# None so the caller can fall back to a DOM parse.
+def extract_fields_fast(html, regions_only=True):
+    fields = {'title': None, 'price': None, 'image_url': None}
+    region_html = slice_product_regions(html) if regions_only else html
+
+    title_tag = FAST_TITLE_TAG_PATTERN.search(region_html)
+    if title_tag is not None:
+        fields['title'] = _fast_element_text(region_html, title_tag)
+
+    fields['price'] = _fast_price(region_html)
+
+    # Every element with each id is tried in order, as the DOM plan does
+    for pattern in FAST_IMAGE_TAG_PATTERNS:
+        for tag_match in pattern.finditer(region_html):
+            attributes = _fast_tag_attributes(tag_match.group(0))
+            fields['image_url'] = _image_url_from_attributes(attributes.get)
+            if fields['image_url'] is not None:
+                break
+        if fields['image_url'] is not None:
+            break
+
+    if fields['image_url'] is None:
+        fields['image_url'] = _fast_color_images_url(region_html)
+
+    return fields
+
+
+# Function to run every extraction strategy on one downloaded page before
+# anyone considers fetching it again. Each strategy only fills the fields the
+# earlier ones missed: the raw-text fast path, the DOM plan (product block,
+# then whole page) and finally a raw-text scan of the whole page. needed
+# limits the work to the fields the caller is still missing. Returns
+# (fields, path) where path is 'fast' when no DOM was built, else 'dom'.
+def extract_product_fields_with_fast_path(html, backend=DEFAULT_PARSER_BACKEND, needed=None):
+    needed = set(needed) if needed is not None else {'title', 'price', 'image_url'}
+
+    def missing(fields):
+        return [name for name in needed if fields[name] is None]
+
+    fields = extract_fields_fast(html)
+    if not missing(fields):
+        return fields, 'fast'
+
+    dom_fields = extract_product_fields(html, backend)
+    for name, value in fields.items():
+        if dom_fields[name] is None:
+            dom_fields[name] = value
+    fields = dom_fields
+
+    if missing(fields):
+        for name, value in extract_fields_fast(html, regions_only=False).items():
+            if fields[name] is None:
+                fields[name] = value
+
+    return fields, 'dom'
+
+
+# Function to time every installed backend on the same page and check they
+# extract identical fields
+def compare_parser_backends(html, repeat=5, regions_only=True):
+    results = {}
+    for name in PARSER_BACKENDS:
+        backend = get_parser_backend(name)
+        timings = []
+        fields = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fields = extract_product_fields(html, backend, regions_only)
+            timings.append(time.perf_counter() - start)
+        results[name] = {'fields': fields, 'best_seconds': min(timings), 'mean_seconds': sum(timings) / len(timings)}
+
+    reference = results['html.parser']['fields']
+    for result in results.values():
+        result['matches_html_parser'] = result['fields'] == reference
+    return results
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print('Usage: python parsers.py PAGE.html [PAGE.html ...]')
+        sys.exit(1)
+
+    for path in sys.argv[1:]:
+        with open(path, encoding='utf-8', errors='replace') as page_file:
+            page_html = page_file.read()
+        print(f'{path} ({len(page_html) / 1024:.0f} KiB)')
+        for regions_only in (False, True):
+            label = 'product regions' if regions_only else 'full page'
+            for name, result in compare_parser_backends(page_html, regions_only=regions_only).items():
+                match = 'ok' if result['matches_html_parser'] else 'MISMATCH'
+                print(f'  {label:16} {name:12} best {result["best_seconds"] * 1000:8.2f} ms  '
+                      f'mean {result["mean_seconds"] * 1000:8.2f} ms  {match}')
+
+        start = time.perf_counter()
+        fast_fields = extract_fields_fast(page_html)
+        fast_seconds = time.perf_counter() - start
+        if all(value is not None for value in fast_fields.values()):
+            match = 'ok' if fast_fields == extract_product_fields(page_html, 'html.parser') else 'MISMATCH'
+        else:
+            match = 'miss (falls back to DOM)'
+        print(f'  {"raw text":16} {"fast path":12} once {fast_seconds * 1000:8.2f} ms  {match}')
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+
+# Thousands separators are stripped before the first number in a price
+# string is taken, so '$1,299.99' reads as 1299.99 rather than 1
+PRICE_NUMBER_PATTERN = r'(\d+\.\d+|\d+)'
+THOUSANDS_SEPARATOR_PATTERN = r'(?<=\d),(?=\d{3}(?!\d))'
+
+CURRENCY_PATTERN = r'(US\$|CA\$|A\$|[$€£¥₹]|\b(?:USD|EUR|GBP|CAD|JPY|INR|AUD)\b)'
+CURRENCY_CODES = {
+    '$': 'USD',
+    'US$': 'USD',
+    'CA$': 'CAD',
+    'A$': 'AUD',
+    '€': 'EUR',
+    '£': 'GBP',
+    '¥': 'JPY',
+    '₹': 'INR'
+}
+
+
+# Function to parse a Series of price strings in one vectorized pass.
+# Returns (Numeric_Price, Price_Currency): a float64 Series with NaN where
+# there is no number ('N/A', 'See Details', ...) and a Series of ISO
+# currency codes, None where none could be told.
+def parse_prices(prices):
+    text = prices.astype(str)
+    numeric_price = pd.to_numeric(
+        text.str.replace(THOUSANDS_SEPARATOR_PATTERN, '', regex=True).str.extract(PRICE_NUMBER_PATTERN, expand=False),
+        errors='coerce'
+    ).astype('float64')
+
+    currency = text.str.extract(CURRENCY_PATTERN, expand=False).replace(CURRENCY_CODES)
+    currency = currency.where(numeric_price.notna() & currency.notna(), None)
+    return numeric_price, currency
+
+
+# Function to add Numeric_Price and Price_Currency columns parsed from
+# Product_Price, in place
+def add_price_columns(df):
+    if 'Product_Price' not in df.columns:
+        return df
+    df['Numeric_Price'], df['Price_Currency'] = parse_prices(df['Product_Price'])
+    return df
+
+
+# Function to get a DataFrame's prices as a float numpy array, parsing
+# Product_Price for data enriched before Numeric_Price existed
+def numeric_prices(df):
+    if 'Numeric_Price' in df.columns:
+        return df['Numeric_Price'].to_numpy(dtype='float64', na_value=np.nan)
+    return parse_prices(df['Product_Price'])[0].to_numpy()
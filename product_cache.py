@@ -0,0 +1,117 @@
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_PATH = os.environ.get('PRODUCT_CACHE_PATH', os.path.join('.cache', 'product_cache.sqlite3'))
+
+# How long each cached field stays fresh, in seconds. Prices move much faster
+# than titles and images, so they expire first.
+DEFAULT_FIELD_TTLS = {
+    'title': 30 * 24 * 3600,
+    'image_url': 30 * 24 * 3600,
+    'price': 6 * 3600
+}
+
+CACHE_HIT = 'hit'
+CACHE_MISS = 'miss'
+CACHE_EXPIRED = 'expired'
+
+
+# Persistent cache of the product_details dicts returned by
+# get_amazon_product_details, stored one row per (asin, field) so every field
+# can carry its own fetch time and TTL. Only successful fetches are stored.
+class ProductCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, field_ttls=None):
+        self.path = path
+        self.field_ttls = dict(DEFAULT_FIELD_TTLS)
+        if field_ttls:
+            self.field_ttls.update(field_ttls)
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Streamlit runs every rerun on a new thread, so the connection is
+        # shared across threads and serialised with a lock instead.
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS product_fields (
+                asin TEXT NOT NULL,
+                field TEXT NOT NULL,
+                value TEXT,
+                fetched_at REAL NOT NULL,
+                PRIMARY KEY (asin, field)
+            )
+        """)
+        self._conn.commit()
+
+    # Function to look up an ASIN. Returns (product_details, status,
+    # expired_fields) where status is CACHE_HIT, CACHE_MISS or CACHE_EXPIRED.
+    # On a hit product_details is complete; when some fields have expired it
+    # only holds the fields that are still fresh, and expired_fields lists the
+    # ones to refetch. A miss returns None and every field.
+    def get(self, asin, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT field, value, fetched_at FROM product_fields WHERE asin = ?',
+                (str(asin),)
+            ).fetchall()
+
+        if not rows:
+            return None, CACHE_MISS, list(self.field_ttls)
+
+        fields = {field: (value, fetched_at) for field, value, fetched_at in rows}
+        fresh_fields = {
+            field: fields[field][0] for field, ttl in self.field_ttls.items()
+            if field in fields and now - fields[field][1] <= ttl
+        }
+        expired_fields = [field for field in self.field_ttls if field not in fresh_fields]
+        if expired_fields:
+            return fresh_fields, CACHE_EXPIRED, expired_fields
+
+        product_details = {
+            'asin': asin,
+            'title': fresh_fields['title'],
+            'price': fresh_fields['price'],
+            'image_url': fresh_fields['image_url'],
+            'success': True,
+            'retry_count': 0,
+            'error': None
+        }
+        return product_details, CACHE_HIT, []
+
+    # Function to store a successful fetch. fields limits the write to the
+    # fields that were actually fetched, so a refreshed price doesn't also
+    # restart the TTL of a title that was taken from the cache.
+    def put(self, asin, product_details, fields=None, now=None):
+        if not product_details.get('success'):
+            return
+        now = time.time() if now is None else now
+        fields = self.field_ttls if fields is None else fields
+        rows = [(str(asin), field, product_details.get(field), now) for field in fields]
+        with self._lock:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO product_fields (asin, field, value, fetched_at) VALUES (?, ?, ?, ?)',
+                rows
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_default_product_cache = None
+_default_product_cache_lock = threading.Lock()
+
+# Function to get the process-wide product cache, opened on first use
+def get_default_product_cache():
+    global _default_product_cache
+    with _default_product_cache_lock:
+        if _default_product_cache is None:
+            _default_product_cache = ProductCache()
+        return _default_product_cache
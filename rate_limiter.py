@@ -0,0 +1,119 @@
+import random
+import threading
+import time
+from collections import deque
+
+DEFAULT_INITIAL_RATE = 2.0
+DEFAULT_MIN_RATE = 0.2
+DEFAULT_MAX_RATE = 20.0
+DEFAULT_INCREASE_STEP = 0.25
+DEFAULT_INCREASE_EVERY = 10
+DEFAULT_DECREASE_FACTOR = 0.5
+DEFAULT_DECREASE_COOLDOWN = 5.0
+MAX_BACKOFF_SECONDS = 60.0
+
+
+# Shared token bucket for every request on the fetch path. The refill rate
+# adapts AIMD-style: it grows by increase_step after every increase_every
+# healthy responses and is multiplied by decrease_factor on a 503, 429 or
+# robot-check page. Blocks that arrive within decrease_cooldown of the last
+# cut are treated as the same congestion event, so a burst of concurrent
+# 503s only halves the rate once.
+class AdaptiveRateLimiter:
+    def __init__(self, initial_rate=DEFAULT_INITIAL_RATE, min_rate=DEFAULT_MIN_RATE, max_rate=DEFAULT_MAX_RATE,
+                 increase_step=DEFAULT_INCREASE_STEP, increase_every=DEFAULT_INCREASE_EVERY,
+                 decrease_factor=DEFAULT_DECREASE_FACTOR, decrease_cooldown=DEFAULT_DECREASE_COOLDOWN):
+        self.rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase_step = increase_step
+        self.increase_every = increase_every
+        self.decrease_factor = decrease_factor
+        self.decrease_cooldown = decrease_cooldown
+
+        self._lock = threading.Lock()
+        self._tokens = 1.0
+        self._last_refill = time.monotonic()
+        self._healthy_streak = 0
+        self._last_decrease = 0.0
+        self._consecutive_blocks = 0
+        self.changes = deque(maxlen=200)
+
+    def _refill(self, now):
+        capacity = max(1.0, self.rate)
+        self._tokens = min(capacity, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    # Function to block the calling worker until a request token is available
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                wait_time = (1.0 - self._tokens) / self.rate
+            time.sleep(wait_time)
+
+    def _change_rate(self, new_rate, reason):
+        old_rate = self.rate
+        self.rate = min(self.max_rate, max(self.min_rate, new_rate))
+        if self.rate == old_rate:
+            return None
+        message = f'Rate limiter: {old_rate:.2f} -> {self.rate:.2f} req/s ({reason})'
+        self.changes.append((time.time(), old_rate, self.rate, reason))
+        return message
+
+    # Function to record a healthy response. Returns a log message when the
+    # rate was raised, otherwise None.
+    def record_success(self):
+        with self._lock:
+            self._consecutive_blocks = 0
+            self._healthy_streak += 1
+            if self._healthy_streak < self.increase_every:
+                return None
+            self._healthy_streak = 0
+            return self._change_rate(
+                self.rate + self.increase_step,
+                f'{self.increase_every} healthy responses in a row'
+            )
+
+    # Function to record a throttled or blocked response. Returns a log
+    # message when the rate was cut, otherwise None.
+    def record_block(self, reason):
+        with self._lock:
+            self._healthy_streak = 0
+            self._consecutive_blocks += 1
+            now = time.monotonic()
+            if now - self._last_decrease < self.decrease_cooldown:
+                return None
+            self._last_decrease = now
+            self._tokens = 0.0
+            return self._change_rate(self.rate * self.decrease_factor, reason)
+
+    # Function to work out how long a worker should wait before retrying
+    # after a block. Honours Retry-After when Amazon sends one, otherwise
+    # backs off exponentially with jitter.
+    def backoff_delay(self, attempt, retry_after=None):
+        if retry_after:
+            try:
+                return min(MAX_BACKOFF_SECONDS, float(retry_after))
+            except ValueError:
+                pass
+        with self._lock:
+            blocks = max(1, self._consecutive_blocks)
+        ceiling = min(MAX_BACKOFF_SECONDS, 2.0 * (2 ** (attempt + blocks - 1)))
+        return random.uniform(ceiling / 2, ceiling)
+
+
+_default_rate_limiter = None
+_default_rate_limiter_lock = threading.Lock()
+
+# Function to get the process-wide rate limiter shared by every fetch
+def get_default_rate_limiter():
+    global _default_rate_limiter
+    with _default_rate_limiter_lock:
+        if _default_rate_limiter is None:
+            _default_rate_limiter = AdaptiveRateLimiter()
+        return _default_rate_limiter
@@ -0,0 +1,217 @@
+import argparse
+import glob
+import hashlib
+import html
+import os
+import random
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROBOT_CHECK_PAGE = """<html><head><title>Robot Check</title></head><body>
+<form method="get" action="/errors/validateCaptcha">
+<p>Enter the characters you see below</p>
+<p>Sorry, we just need to make sure you're not a robot. For best results, please make sure your browser is accepting cookies.</p>
+<p>To discuss automated access to Amazon data please contact api-services-support@amazon.com.</p>
+</form></body></html>"""
+
+SERVICE_UNAVAILABLE_PAGE = '<html><body><h1>503 - Service Unavailable</h1></body></html>'
+SERVER_ERROR_PAGE = '<html><body><h1>500 - Internal Server Error</h1></body></html>'
+
+# Reviews and recommendations make up most of a real product page. The
+# synthetic page repeats this after the product block so streaming and
+# parsing have a realistic amount of HTML to get through.
+FILLER_BLOCK = (
+    '<div class="a-section review"><span class="a-color-price">$9.99</span>'
+    '<img class="a-dynamic-image" src="https://m.media-amazon.com/images/I/rec._AC_UL160_.jpg">'
+    '<p>Great product, would buy again. Arrived on time and works as described.</p></div>\n'
+)
+
+
+# Function to render a product page in the layout the extractors expect, for
+# when no recorded pages are available. Title, price and image are derived
+# from the ASIN so every ASIN gets its own stable values.
+def render_product_page(asin, filler_blocks=1500):
+    digest = hashlib.sha1(str(asin).encode('utf-8')).hexdigest()
+    price = f'${int(digest[:4], 16) % 200 + 1}.{int(digest[4:6], 16) % 100:02d}'
+    image_id = f'{digest[:11].upper()}L'
+    title = html.escape(f'Replay Product {asin}')
+    return (
+        '<html><head><title>Amazon.com</title></head><body>'
+        '<div id="nav-belt">navigation</div>'
+        '<div id="dp-container"><div id="leftCol"><div id="imageBlock"><div id="imgTagWrapperId">'
+        f'<img id="landingImage" src="https://m.media-amazon.com/images/I/{image_id}._AC_SX300_.jpg" '
+        f'data-old-hires="https://m.media-amazon.com/images/I/{image_id}._AC_SL1500_.jpg"></div></div></div>'
+        f'<div id="centerCol"><span id="productTitle">  {title}  </span>'
+        f'<div class="a-price"><span class="a-offscreen">{price}</span></div></div>'
+        '<div id="rightCol"><div id="buybox"></div></div></div>'
+        '<div id="aplus_feature_div">' + FILLER_BLOCK * filler_blocks + '</div>'
+        '<div id="reviewsMedley">' + FILLER_BLOCK * (filler_blocks // 5) + '</div>'
+        '</body></html>'
+    )
+
+
+# Stand-in for amazon.com product pages. Serves recorded pages from
+# pages_dir (chosen per ASIN, so the same ASIN always gets the same page) or
+# synthetic ones, and injects faults in configurable proportions: latency
+# with jitter, 500 errors, dropped connections, 503 throttling and robot-check
+# pages. The fault rolls use a seeded RNG so benchmark runs are repeatable.
+class ReplayServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, pages_dir=None, latency_ms=0.0, latency_jitter_ms=0.0,
+                 error_rate=0.0, reset_rate=0.0, throttle_rate=0.0, robot_rate=0.0, retry_after=1, seed=0):
+        super().__init__((host, port), ReplayRequestHandler)
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.error_rate = error_rate
+        self.reset_rate = reset_rate
+        self.throttle_rate = throttle_rate
+        self.robot_rate = robot_rate
+        self.retry_after = retry_after
+        self.pages = []
+        if pages_dir:
+            for path in sorted(glob.glob(os.path.join(pages_dir, '*.html'))):
+                with open(path, 'rb') as page_file:
+                    self.pages.append(page_file.read())
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats = {'requests': 0, 'ok': 0, 'errors': 0, 'resets': 0, 'throttled': 0, 'robot_checks': 0}
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def page_for(self, asin):
+        if not self.pages:
+            return render_product_page(asin).encode('utf-8')
+        index = int(hashlib.sha1(asin.encode('utf-8')).hexdigest(), 16) % len(self.pages)
+        return self.pages[index]
+
+    # Function to decide what the next request gets: 'reset', 'error',
+    # 'throttle', 'robot' or 'ok', plus the latency to add first
+    def roll(self):
+        with self._random_lock:
+            latency = self.latency_ms + self._random.uniform(-self.latency_jitter_ms, self.latency_jitter_ms)
+            outcome_roll = self._random.random()
+
+        outcome = 'ok'
+        for name, rate in (('reset', self.reset_rate), ('error', self.error_rate),
+                           ('throttle', self.throttle_rate), ('robot', self.robot_rate)):
+            if outcome_roll < rate:
+                outcome = name
+                break
+            outcome_roll -= rate
+        return outcome, max(0.0, latency) / 1000.0
+
+    def count(self, key):
+        with self._stats_lock:
+            self.stats['requests'] += 1
+            self.stats[key] += 1
+
+    # Clients hanging up mid-response (the fetcher stopping early, or a
+    # benchmark shutting down) are expected, not worth a traceback
+    def handle_error(self, request, client_address):
+        pass
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, name='replay-server', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class ReplayRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_page(self, status, body, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # The fetcher closes early once it has the product block
+            self.close_connection = True
+
+    def do_GET(self):
+        server = self.server
+        if not self.path.startswith('/dp/'):
+            self.send_page(404, b'<html><body>Not found</body></html>')
+            return
+
+        asin = self.path[len('/dp/'):].split('/')[0].split('?')[0]
+        outcome, latency = server.roll()
+        if latency:
+            time.sleep(latency)
+
+        if outcome == 'reset':
+            server.count('resets')
+            self.connection.shutdown(socket.SHUT_RDWR)
+            self.close_connection = True
+        elif outcome == 'error':
+            server.count('errors')
+            self.send_page(500, SERVER_ERROR_PAGE.encode('utf-8'))
+        elif outcome == 'throttle':
+            server.count('throttled')
+            self.send_page(503, SERVICE_UNAVAILABLE_PAGE.encode('utf-8'), {'Retry-After': str(server.retry_after)})
+        elif outcome == 'robot':
+            server.count('robot_checks')
+            self.send_page(200, ROBOT_CHECK_PAGE.encode('utf-8'))
+        else:
+            server.count('ok')
+            self.send_page(200, server.page_for(asin))
+
+
+# Function to add the fault-injection options shared by this script and the
+# benchmark
+def add_fault_arguments(parser):
+    parser.add_argument('--pages', default=None, help='Directory of recorded product pages (*.html); synthetic pages if omitted')
+    parser.add_argument('--latency-ms', type=float, default=150.0, help='Mean added latency per request')
+    parser.add_argument('--latency-jitter-ms', type=float, default=100.0, help='Latency varies uniformly by up to this much')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests answered with a 500')
+    parser.add_argument('--reset-rate', type=float, default=0.0, help='Share of requests whose connection is dropped')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='Share of requests answered with a 503')
+    parser.add_argument('--robot-rate', type=float, default=0.0, help='Share of requests answered with a robot-check page')
+    parser.add_argument('--retry-after', type=int, default=1, help='Retry-After seconds sent with 503s')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the fault rolls')
+
+
+# Function to build a ReplayServer from parsed add_fault_arguments options
+def server_from_args(args, host='127.0.0.1', port=0):
+    return ReplayServer(
+        host, port, pages_dir=args.pages, latency_ms=args.latency_ms, latency_jitter_ms=args.latency_jitter_ms,
+        error_rate=args.error_rate, reset_rate=args.reset_rate, throttle_rate=args.throttle_rate,
+        robot_rate=args.robot_rate, retry_after=args.retry_after, seed=args.seed
+    )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve recorded or synthetic Amazon product pages with injected faults.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    server = server_from_args(args, args.host, args.port)
+    print(f'Replay server on {server.base_url} - run the app with AMAZON_BASE_URL={server.base_url}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f'Served: {server.stats}')
@@ -0,0 +1,120 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+MAX_CACHED_INDEXES = 4
+MAX_CACHED_QUERIES = 64
+
+# Keeps a query from matching across the end of one field and the start of
+# the next
+FIELD_SEPARATOR = '\n'
+
+
+# Substring search over a few text columns of one dataset. Every row's
+# fields are lowercased and joined once, and each trigram maps to the sorted
+# positions of the rows containing it. A query of three or more characters
+# only checks the rows holding all of its trigrams; shorter ones scan. Recent
+# results are kept, so typing one more character only re-checks the rows
+# that matched what was typed before.
+class SearchIndex:
+    def __init__(self, df, columns):
+        self.columns = [column for column in columns if column and column in df.columns]
+        self.size = len(df)
+        fields = [
+            [value.lower() if isinstance(value, str) else '' for value in df[column].tolist()]
+            for column in self.columns
+        ]
+        self._texts = [FIELD_SEPARATOR.join(row) for row in zip(*fields)] if fields else [''] * self.size
+
+        postings = {}
+        for position, text in enumerate(self._texts):
+            for trigram in {text[i:i + 3] for i in range(len(text) - 2)}:
+                postings.setdefault(trigram, []).append(position)
+        self._postings = {trigram: np.array(positions, dtype=np.int32) for trigram, positions in postings.items()}
+
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'queries': 0, 'refined': 0, 'indexed': 0, 'scanned': 0}
+
+    def _candidates(self, query):
+        # The longest earlier query contained in this one already narrowed
+        # things down; anything matching query must be among its results
+        with self._lock:
+            previous = max((earlier for earlier in self._results if earlier in query), key=len, default=None)
+            if previous is not None:
+                self.stats['refined'] += 1
+                return self._results[previous]
+
+        if len(query) >= 3:
+            trigrams = {query[i:i + 3] for i in range(len(query) - 2)}
+            postings = []
+            for trigram in trigrams:
+                positions = self._postings.get(trigram)
+                if positions is None:
+                    return np.empty(0, dtype=np.int32)
+                postings.append(positions)
+            postings.sort(key=len)
+            candidates = postings[0]
+            for positions in postings[1:]:
+                candidates = np.intersect1d(candidates, positions, assume_unique=True)
+            with self._lock:
+                self.stats['indexed'] += 1
+            return candidates
+
+        with self._lock:
+            self.stats['scanned'] += 1
+        return np.arange(self.size, dtype=np.int32)
+
+    # Function to get the sorted row positions whose fields contain query,
+    # ignoring case
+    def search(self, query):
+        query = query.lower()
+        if not query:
+            return np.arange(self.size, dtype=np.int32)
+
+        with self._lock:
+            self.stats['queries'] += 1
+            if query in self._results:
+                self._results.move_to_end(query)
+                return self._results[query]
+
+        texts = self._texts
+        candidates = self._candidates(query)
+        matches = np.array([position for position in candidates.tolist() if query in texts[position]], dtype=np.int32)
+
+        with self._lock:
+            self._results[query] = matches
+            while len(self._results) > MAX_CACHED_QUERIES:
+                self._results.popitem(last=False)
+        return matches
+
+
+# Function to fingerprint the searchable columns of a dataset, so the same
+# products get the same index across reruns and sessions
+def dataset_fingerprint(df, columns):
+    columns = [column for column in columns if column and column in df.columns]
+    row_hashes = pd.util.hash_pandas_object(df[columns], index=False)
+    return hashlib.sha1(row_hashes.values.tobytes()).hexdigest()
+
+
+_search_indexes = OrderedDict()
+_search_indexes_lock = threading.Lock()
+
+# Function to get the search index for a dataset, building it on first use
+def get_search_index(df, columns):
+    key = (dataset_fingerprint(df, columns), tuple(columns))
+    with _search_indexes_lock:
+        index = _search_indexes.get(key)
+        if index is not None:
+            _search_indexes.move_to_end(key)
+            return index
+
+    index = SearchIndex(df, columns)
+    with _search_indexes_lock:
+        _search_indexes[key] = index
+        while len(_search_indexes) > MAX_CACHED_INDEXES:
+            _search_indexes.popitem(last=False)
+    return index
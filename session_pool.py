@@ -0,0 +1,251 @@
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+DEFAULT_POOL_SIZE = 8
+DEFAULT_MAX_REQUESTS_PER_SESSION = 50
+
+USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/115.0",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36 Edg/120.0.0.0",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Safari/605.1.15"
+]
+
+# The lease making a request on the current worker thread, so connections
+# can report their handshakes to it
+_current_lease = threading.local()
+
+
+def _report_connect(elapsed):
+    lease = getattr(_current_lease, 'lease', None)
+    if lease is not None:
+        lease.connects += 1
+        lease.connect_seconds += elapsed
+
+
+# urllib3 connections that time every TCP (and TLS) connect. urllib3 quietly
+# reconnects pooled connections the server has dropped, so counting connect()
+# calls is the only reliable way to tell a reused connection from a new one.
+class TimedHTTPConnection(HTTPConnection):
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        _report_connect(time.perf_counter() - start)
+
+
+class TimedHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        _report_connect(time.perf_counter() - start)
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': TimedHTTPConnectionPool,
+            'https': TimedHTTPSConnectionPool
+        }
+
+
+# Function to create a session with proper headers
+def create_session(pool_maxsize=4):
+    headers = {
+        "User-Agent": random.choice(USER_AGENTS),
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
+        "Accept-Language": "en-US,en;q=0.5",
+        "Accept-Encoding": "gzip, deflate, br",
+        "Connection": "keep-alive",
+        "Upgrade-Insecure-Requests": "1",
+        "Sec-Fetch-Dest": "document",
+        "Sec-Fetch-Mode": "navigate",
+        "Sec-Fetch-Site": "none",
+        "Sec-Fetch-User": "?1",
+        "Cache-Control": "max-age=0",
+        "Referer": "https://www.google.com/"
+    }
+
+    session = requests.Session()
+    session.headers.update(headers)
+
+    adapter = TimedHTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    cookies = {
+        "session-id": f"{random.randint(100000000, 999999999)}",
+        "session-id-time": f"{int(time.time())}",
+        "i18n-prefs": "USD",
+        "sp-cdn": f"L5Z9:{random.randint(100000, 999999)}"
+    }
+
+    for key, value in cookies.items():
+        session.cookies.set(key, value)
+
+    return session
+
+# One long-lived session with its own user-agent and cookie identity
+class PooledSession:
+    def __init__(self, pool_maxsize):
+        self.session = create_session(pool_maxsize)
+        self.requests_made = 0
+        self.created_at = time.time()
+
+    def close(self):
+        self.session.close()
+
+
+# A fixed-size set of keep-alive sessions shared by all fetch workers.
+# A worker leases a session for one request, so each session is only ever
+# used by one thread at a time. Sessions are rotated (closed and replaced by a
+# fresh identity) after max_requests_per_session requests or after a block.
+class SessionPool:
+    def __init__(self, size=DEFAULT_POOL_SIZE, max_requests_per_session=DEFAULT_MAX_REQUESTS_PER_SESSION, pool_maxsize=4):
+        self.size = max(1, int(size))
+        self.max_requests_per_session = max_requests_per_session
+        self.pool_maxsize = pool_maxsize
+        self._idle = []
+        self._leased = 0
+        self._condition = threading.Condition()
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self._condition:
+            self.stats = {
+                'requests': 0,
+                'new_connections': 0,
+                'reused_connections': 0,
+                'handshake_seconds': 0.0,
+                'sessions_created': 0,
+                'rotations_max_requests': 0,
+                'rotations_blocked': 0
+            }
+
+    def resize(self, size):
+        with self._condition:
+            self.size = max(1, int(size))
+            while len(self._idle) + self._leased > self.size and self._idle:
+                self._idle.pop().close()
+            self._condition.notify_all()
+
+    def _acquire(self):
+        with self._condition:
+            while not self._idle and self._leased >= self.size:
+                self._condition.wait()
+            self._leased += 1
+            if self._idle:
+                return self._idle.pop()
+            self.stats['sessions_created'] += 1
+        return PooledSession(self.pool_maxsize)
+
+    def _release(self, pooled, rotate_reason=None):
+        with self._condition:
+            self._leased -= 1
+            if rotate_reason is None and pooled.requests_made >= self.max_requests_per_session:
+                rotate_reason = 'max_requests'
+            if rotate_reason == 'max_requests':
+                self.stats['rotations_max_requests'] += 1
+            elif rotate_reason == 'blocked':
+                self.stats['rotations_blocked'] += 1
+
+            if rotate_reason is None and len(self._idle) + self._leased < self.size:
+                self._idle.append(pooled)
+                pooled = None
+            self._condition.notify()
+
+        if pooled is not None:
+            pooled.close()
+
+    # Function to lease a session for a single request. The caller gets a
+    # PooledLease and calls lease.get(url, ...) and, if the response was a
+    # block page, lease.mark_blocked() so the identity is thrown away.
+    @contextmanager
+    def lease(self):
+        pooled = self._acquire()
+        lease = PooledLease(self, pooled)
+        try:
+            yield lease
+        finally:
+            self._release(pooled, 'blocked' if lease.blocked else None)
+
+    def _record_request(self, connects, connect_seconds):
+        with self._condition:
+            self.stats['requests'] += 1
+            if connects:
+                self.stats['new_connections'] += connects
+                self.stats['handshake_seconds'] += connect_seconds
+            else:
+                self.stats['reused_connections'] += 1
+
+    # Function to summarise connection reuse for the processing log.
+    # Handshake time saved is the measured mean connect time multiplied by
+    # the number of requests that didn't need a connect. Pass an earlier
+    # report as since to summarise only what happened after it, which is how
+    # jobs sharing the pool each get their own numbers.
+    def report(self, since=None):
+        with self._condition:
+            stats = dict(self.stats)
+        if since is not None:
+            for key in stats:
+                stats[key] -= since.get(key, 0)
+
+        fresh = stats['new_connections']
+        reused = stats['reused_connections']
+        saved = 0.0
+        if fresh:
+            saved = stats['handshake_seconds'] / fresh * reused
+
+        stats['reuse_rate'] = reused / stats['requests'] if stats['requests'] else 0.0
+        stats['handshake_seconds_saved'] = saved
+        return stats
+
+    def close(self):
+        with self._condition:
+            idle, self._idle = self._idle, []
+        for pooled in idle:
+            pooled.close()
+
+
+# A single request's view of a pooled session
+class PooledLease:
+    def __init__(self, pool, pooled):
+        self.pool = pool
+        self.pooled = pooled
+        self.blocked = False
+        self.connects = 0
+        self.connect_seconds = 0.0
+
+    @property
+    def session(self):
+        return self.pooled.session
+
+    def get(self, url, **kwargs):
+        self.connects = 0
+        self.connect_seconds = 0.0
+        _current_lease.lease = self
+        try:
+            return self.pooled.session.get(url, **kwargs)
+        finally:
+            _current_lease.lease = None
+            self.pooled.requests_made += 1
+            self.pool._record_request(self.connects, self.connect_seconds)
+
+    def mark_blocked(self):
+        self.blocked = True
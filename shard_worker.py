@@ -0,0 +1,90 @@
+import argparse
+import queue
+import time
+
+from fetcher import DEFAULT_CONCURRENCY, iter_product_details, drain_queue
+from rate_limiter import DEFAULT_MIN_RATE, DEFAULT_MAX_RATE, AdaptiveRateLimiter
+from work_queue import DEFAULT_WORK_QUEUE_PATH, DEFAULT_LEASE_SECONDS, SHARD_PENDING, SHARD_LEASED, WorkQueue, make_worker_id
+
+IDLE_POLL_SECONDS = 2.0
+
+
+# Function to print a worker's pending log lines and write them to the work
+# queue under the job they belong to
+def flush_logs(work_queue, job_id, log_queue):
+    lines = drain_queue(log_queue)
+    for level, message in lines:
+        print(f'[{level}] {message}', flush=True)
+    work_queue.record_logs(job_id, lines)
+
+
+# Function to lease shards from the work queue and fetch them until there is
+# nothing left. With job_id set the worker only takes that job's shards and
+# exits once every one of them is done; otherwise it serves any job and exits
+# after idle_timeout seconds without work (never, if idle_timeout is None).
+# Results are written back after every batch, which also renews the lease,
+# along with the batch's log lines for the coordinator to show.
+# rate and max_rate set this worker's share of the request rate; without
+# them it paces itself like a single process would.
+def run_worker(queue_path=DEFAULT_WORK_QUEUE_PATH, concurrency=DEFAULT_CONCURRENCY, lease_seconds=DEFAULT_LEASE_SECONDS,
+               job_id=None, idle_timeout=None, worker_id=None, rate=None, max_rate=None):
+    worker_id = worker_id or make_worker_id()
+    rate_limiter = None
+    if rate is not None or max_rate is not None:
+        max_rate = DEFAULT_MAX_RATE if max_rate is None else max_rate
+        rate = min(max_rate, rate) if rate is not None else max_rate
+        rate_limiter = AdaptiveRateLimiter(initial_rate=rate, min_rate=min(DEFAULT_MIN_RATE, rate), max_rate=max_rate)
+    work_queue = WorkQueue(queue_path)
+    log_queue = queue.Queue()
+    idle_since = time.time()
+    print(f'Worker {worker_id}: serving {queue_path}' + (f' for job {job_id}' if job_id else ''), flush=True)
+
+    try:
+        while True:
+            lease = work_queue.lease_shard(worker_id, lease_seconds, job_id)
+            if lease is None:
+                if job_id is not None:
+                    counts = work_queue.shard_counts(job_id)
+                    if not counts[SHARD_PENDING] and not counts[SHARD_LEASED]:
+                        return
+                elif idle_timeout is not None and time.time() - idle_since > idle_timeout:
+                    return
+                time.sleep(IDLE_POLL_SECONDS)
+                continue
+
+            shard_id, shard_job_id, asins = lease
+            log_queue.put(('info', f'Worker {worker_id}: leased shard {shard_id} ({len(asins)} ASINs)'))
+
+            known_fields = work_queue.get_known_fields(shard_job_id, asins)
+            lease_lost = False
+            for completed in iter_product_details(asins, log_queue, concurrency=concurrency, poll_interval=1.0,
+                                                  rate_limiter=rate_limiter, known_fields=known_fields):
+                flush_logs(work_queue, shard_job_id, log_queue)
+                if lease_lost:
+                    continue
+                results = [(asin, product_details) for _, asin, product_details in completed]
+                if not work_queue.record_results(shard_id, worker_id, results, lease_seconds):
+                    lease_lost = True
+                    log_queue.put(('warning', f'Worker {worker_id}: lost the lease on shard {shard_id}, dropping its remaining results'))
+
+            if not lease_lost:
+                work_queue.complete_shard(shard_id, worker_id)
+                log_queue.put(('info', f'Worker {worker_id}: finished shard {shard_id}'))
+            flush_logs(work_queue, shard_job_id, log_queue)
+            idle_since = time.time()
+    finally:
+        work_queue.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Fetch Amazon product details for shards leased from a work queue.')
+    parser.add_argument('--queue', default=DEFAULT_WORK_QUEUE_PATH, help='Path to the work queue SQLite file')
+    parser.add_argument('--job-id', default=None, help='Only take shards of this job and exit when it is done')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help='Concurrent requests in this worker')
+    parser.add_argument('--lease-seconds', type=float, default=DEFAULT_LEASE_SECONDS, help='How long a shard lease lasts without renewal')
+    parser.add_argument('--idle-timeout', type=float, default=None, help='Exit after this many seconds without work')
+    parser.add_argument('--rate', type=float, default=None, help='Requests per second this worker starts at')
+    parser.add_argument('--max-rate', type=float, default=None, help='Requests per second this worker never goes above')
+    args = parser.parse_args()
+
+    run_worker(args.queue, args.concurrency, args.lease_seconds, args.job_id, args.idle_timeout, rate=args.rate, max_rate=args.max_rate)
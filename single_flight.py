@@ -0,0 +1,74 @@
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+# Process-wide registry of in-flight calls, keyed by ASIN. The first caller
+# for a key runs the fetch; anyone asking for the same key while it is still
+# running waits for that call and gets its result instead of fetching again.
+# Nothing is kept once the call finishes; that's the product cache's job.
+class SingleFlight:
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.stats = {'calls': 0, 'shared': 0}
+
+    # Function to run fn() for key unless a call for key is already running.
+    # Returns (result, shared), where shared is True when the result came
+    # from another caller's call. Exceptions are shared the same way.
+    def do(self, key, fn):
+        with self._lock:
+            self.stats['calls'] += 1
+            call = self._calls.get(key)
+            if call is not None:
+                self.stats['shared'] += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+    def report(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['in_flight'] = len(self._calls)
+        stats['shared_rate'] = stats['shared'] / stats['calls'] if stats['calls'] else 0.0
+        return stats
+
+
+_default_single_flight = None
+_default_single_flight_lock = threading.Lock()
+
+# Function to get the process-wide single-flight registry
+def get_default_single_flight():
+    global _default_single_flight
+    with _default_single_flight_lock:
+        if _default_single_flight is None:
+            _default_single_flight = SingleFlight()
+        return _default_single_flight
@@ -0,0 +1,76 @@
+import pandas as pd
+import pytest
+
+from job_runner import JOB_COMPLETE, EnrichmentJob, JobRegistry, keep_fresh_fields
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    # Jobs are only registered here, never actually run
+    monkeypatch.setattr(EnrichmentJob, 'start', lambda job: None)
+    return JobRegistry()
+
+
+def make_upload(asins, **columns):
+    return pd.DataFrame({'Asin': asins, **columns})
+
+
+def finish(job, finished_at):
+    job.status = JOB_COMPLETE
+    job.finished_at = finished_at
+
+
+def test_submit_returns_the_running_job_for_the_same_upload(registry):
+    first = registry.submit(make_upload(['A', 'B']), session_id='one')
+    second = registry.submit(make_upload(['A', 'B']), session_id='two')
+    assert second is first
+    assert first.session_ids == {'one', 'two'}
+
+
+def test_submit_keeps_uploads_with_the_same_asins_apart(registry):
+    first = registry.submit(make_upload(['A', 'B'], Qty=[1, 2]))
+    other_rows = registry.submit(make_upload(['A', 'B'], Qty=[5, 6]))
+    other_options = registry.submit(make_upload(['A', 'B'], Qty=[1, 2]), use_cache=False)
+    assert len({first.job_id, other_rows.job_id, other_options.job_id}) == 3
+    assert other_rows.df['Qty'].tolist() == [5, 6]
+
+
+def test_submit_replaces_a_finished_job(registry):
+    first = registry.submit(make_upload(['A']))
+    finish(first, finished_at=first.created_at)
+    second = registry.submit(make_upload(['A']))
+    assert second is not first
+    assert registry.get(first.job_id) is second
+
+
+def test_jobs_are_listed_per_session(registry):
+    mine = registry.submit(make_upload(['A']), session_id='mine')
+    registry.submit(make_upload(['B']), session_id='theirs')
+    assert registry.jobs('mine') == [mine]
+    assert len(registry.jobs()) == 2
+
+
+def test_finished_jobs_are_evicted_by_age_and_count(monkeypatch):
+    monkeypatch.setattr(EnrichmentJob, 'start', lambda job: None)
+    registry = JobRegistry(max_finished_jobs=2, finished_job_seconds=100)
+    jobs = [registry.submit(make_upload([f'A{index}'])) for index in range(5)]
+    running = jobs.pop()
+    now = jobs[0].created_at
+    finish(jobs[0], now - 500)
+    for index, job in enumerate(jobs[1:]):
+        finish(job, now - index)
+
+    remaining = registry.jobs()
+    assert running in remaining
+    assert jobs[0] not in remaining
+    assert len([job for job in remaining if job.done]) == 2
+
+
+def test_keep_fresh_fields_only_reports_the_expired_fields_missing():
+    failed = {'asin': 'A', 'title': 'Product information not available', 'price': 'N/A', 'image_url': '',
+              'success': False, 'error': 'Failed to retrieve product data after 3 attempts'}
+    kept = keep_fresh_fields(failed, {'title': 'Cached', 'image_url': 'https://example.com/a.jpg'}, ['price'])
+    assert kept['success'] and kept['refresh_failed']
+    assert (kept['title'], kept['price']) == ('Cached', 'N/A')
+    assert kept['error'].startswith('Could not refresh price')
+    assert not failed['success']
@@ -0,0 +1,35 @@
+import pytest
+
+from job_store import JobStore, make_job_id
+
+
+@pytest.fixture
+def store(tmp_path):
+    job_store = JobStore(str(tmp_path / 'jobs.sqlite3'))
+    yield job_store
+    job_store.close()
+
+
+def test_unfinished_job_resumes_from_its_checkpoint(store, tmp_path):
+    assert store.open_job('job', 3) == {}
+    store.checkpoint('job', [('A', {'success': True, 'title': 'a'}), ('B', {'success': False})])
+    store.close()
+
+    reopened = JobStore(str(tmp_path / 'jobs.sqlite3'))
+    try:
+        assert reopened.open_job('job', 3) == {'A': {'success': True, 'title': 'a'}, 'B': {'success': False}}
+    finally:
+        reopened.close()
+
+
+def test_completed_job_starts_over(store):
+    store.open_job('job', 1)
+    store.checkpoint('job', [('A', {'success': True})])
+    store.complete_job('job')
+    assert store.open_job('job', 1) == {}
+
+
+def test_job_id_depends_on_asins_and_fingerprint():
+    assert make_job_id(['A', 'B']) == make_job_id(['A', 'B'])
+    assert make_job_id(['A', 'B']) != make_job_id(['B', 'A'])
+    assert make_job_id(['A', 'B'], 'upload-1') != make_job_id(['A', 'B'], 'upload-2')
@@ -0,0 +1,28 @@
+import math
+
+import pandas as pd
+
+from prices import add_price_columns, numeric_prices, parse_prices
+
+
+def test_parse_prices_reads_the_first_number_and_currency():
+    prices = pd.Series(['$1,299.99', '£12', 'EUR 3.50', 'See Details', 'N/A', '$10.99 - $15.99', None])
+    numeric_price, currency = parse_prices(prices)
+    assert numeric_price.tolist()[:3] == [1299.99, 12.0, 3.5]
+    assert all(math.isnan(value) for value in numeric_price.tolist()[3:5])
+    assert numeric_price[5] == 10.99
+    assert math.isnan(numeric_price[6])
+    assert [None if pd.isna(code) else code for code in currency.tolist()] == ['USD', 'GBP', 'EUR', None, None, 'USD', None]
+
+
+def test_comma_not_followed_by_three_digits_is_not_a_thousands_separator():
+    numeric_price, _ = parse_prices(pd.Series(['1,5', '12,345,678']))
+    assert numeric_price.tolist() == [1.0, 12345678.0]
+
+
+def test_numeric_prices_parses_old_data_without_numeric_price():
+    df = pd.DataFrame({'Product_Price': ['$5', 'N/A']})
+    assert numeric_prices(df)[0] == 5.0
+    add_price_columns(df)
+    assert list(df.columns) == ['Product_Price', 'Numeric_Price', 'Price_Currency']
+    assert numeric_prices(df)[0] == 5.0
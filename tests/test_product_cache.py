@@ -0,0 +1,46 @@
+import pytest
+
+from product_cache import CACHE_EXPIRED, CACHE_HIT, CACHE_MISS, ProductCache
+
+HOUR = 3600
+DETAILS = {'success': True, 'title': 'Title', 'price': '$1.00', 'image_url': 'https://example.com/a.jpg'}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    product_cache = ProductCache(str(tmp_path / 'cache.sqlite3'), field_ttls={'price': HOUR})
+    yield product_cache
+    product_cache.close()
+
+
+def test_unknown_asin_is_a_miss(cache):
+    assert cache.get('A') == (None, CACHE_MISS, ['title', 'image_url', 'price'])
+
+
+def test_fresh_entry_is_a_hit(cache):
+    cache.put('A', DETAILS, now=0)
+    details, status, expired = cache.get('A', now=HOUR - 1)
+    assert status == CACHE_HIT and expired == []
+    assert (details['title'], details['price'], details['success']) == ('Title', '$1.00', True)
+
+
+def test_expired_price_keeps_the_fresh_fields(cache):
+    cache.put('A', DETAILS, now=0)
+    fresh, status, expired = cache.get('A', now=HOUR + 1)
+    assert status == CACHE_EXPIRED
+    assert expired == ['price']
+    assert fresh == {'title': 'Title', 'image_url': 'https://example.com/a.jpg'}
+
+
+def test_refreshing_some_fields_leaves_the_others_ttl_alone(cache):
+    cache.put('A', DETAILS, now=0)
+    cache.put('A', dict(DETAILS, price='$2.00'), ['price'], now=40 * 24 * HOUR)
+    fresh, status, expired = cache.get('A', now=40 * 24 * HOUR)
+    assert status == CACHE_EXPIRED
+    assert expired == ['title', 'image_url']
+    assert fresh == {'price': '$2.00'}
+
+
+def test_failed_fetches_are_not_stored(cache):
+    cache.put('A', dict(DETAILS, success=False))
+    assert cache.get('A')[1] == CACHE_MISS
@@ -0,0 +1,40 @@
+import pandas as pd
+
+from search_index import SearchIndex
+
+PRODUCTS = pd.DataFrame({
+    'Product_Title': ['Wireless Mouse', 'Wired Keyboard', 'USB Cable', None],
+    'Asin': ['B001', 'B002', 'B003', 'B004']
+})
+
+
+def search(index, query):
+    return index.search(query).tolist()
+
+
+def test_search_matches_substrings_in_any_column_ignoring_case():
+    index = SearchIndex(PRODUCTS, ['Product_Title', 'Asin', 'Missing'])
+    assert search(index, 'WIRE') == [0, 1]
+    assert search(index, 'b003') == [2]
+    assert search(index, 'zzz') == []
+    assert search(index, '') == [0, 1, 2, 3]
+
+
+def test_query_does_not_match_across_fields():
+    index = SearchIndex(PRODUCTS, ['Product_Title', 'Asin'])
+    assert search(index, 'cableb003') == []
+
+
+def test_longer_query_refines_the_earlier_results():
+    index = SearchIndex(PRODUCTS, ['Product_Title'])
+    assert search(index, 'wir') == [0, 1]
+    assert index.stats['indexed'] == 1
+    assert search(index, 'wirel') == [0]
+    assert index.stats['refined'] == 1
+    assert index.stats['indexed'] == 1
+
+
+def test_short_queries_scan_every_row():
+    index = SearchIndex(PRODUCTS, ['Product_Title'])
+    assert search(index, 'us') == [0, 2]
+    assert index.stats['scanned'] == 1
@@ -0,0 +1,55 @@
+import pytest
+
+from work_queue import SHARD_DONE, SHARD_LEASED, SHARD_PENDING, WorkQueue
+
+
+@pytest.fixture
+def work_queue(tmp_path):
+    queue = WorkQueue(str(tmp_path / 'queue.sqlite3'))
+    yield queue
+    queue.close()
+
+
+def test_shards_are_leased_once(work_queue):
+    assert work_queue.enqueue_job('job', ['A', 'B', 'C'], shard_size=2) == 2
+    assert work_queue.lease_shard('w1', 60, now=0) == ('job-0', 'job', ['A', 'B'])
+    assert work_queue.lease_shard('w2', 60, now=1) == ('job-1', 'job', ['C'])
+    assert work_queue.lease_shard('w3', 60, now=2) is None
+    assert work_queue.shard_counts('job') == {SHARD_PENDING: 0, SHARD_LEASED: 2, SHARD_DONE: 0}
+
+
+def test_expired_lease_is_reassigned_with_only_the_unfinished_asins(work_queue):
+    work_queue.enqueue_job('job', ['A', 'B', 'C'])
+    work_queue.lease_shard('w1', 60, now=0)
+    assert work_queue.record_results('job-0', 'w1', [('A', {'success': True})], 60, now=10)
+
+    # Recording renewed the lease until 70
+    assert work_queue.lease_shard('w2', 60, now=69) is None
+    assert work_queue.lease_shard('w2', 60, now=71) == ('job-0', 'job', ['B', 'C'])
+
+    # The first worker has lost the shard, so its late results are dropped
+    assert not work_queue.record_results('job-0', 'w1', [('B', {'success': True})], 60, now=72)
+    assert work_queue.record_results('job-0', 'w2', [('B', {'success': True}), ('C', {'success': True})], 60, now=72)
+    work_queue.complete_shard('job-0', 'w2')
+
+    assert [asin for _, asin, _ in work_queue.fetch_results('job')] == ['A', 'B', 'C']
+    assert work_queue.shard_counts('job')[SHARD_DONE] == 1
+
+
+def test_requeueing_a_job_replaces_its_results_known_fields_and_logs(work_queue):
+    work_queue.enqueue_job('job', ['A'], known_fields={'A': {'title': 'Old'}})
+    work_queue.lease_shard('w1', 60, now=0)
+    work_queue.record_results('job-0', 'w1', [('A', {'success': True})], now=0)
+    work_queue.record_logs('job', [('info', 'fetched A')])
+
+    work_queue.enqueue_job('job', ['A'], known_fields={'A': {'title': 'New'}})
+    assert work_queue.fetch_results('job') == []
+    assert work_queue.fetch_logs('job') == []
+    assert work_queue.get_known_fields('job', ['A']) == {'A': {'title': 'New'}}
+
+
+def test_logs_are_read_in_order_after_an_id(work_queue):
+    work_queue.record_logs('job', [('info', 'one'), ('warning', 'two')])
+    first, second = work_queue.fetch_logs('job')
+    assert (first[1:], second[1:]) == (('info', 'one'), ('warning', 'two'))
+    assert work_queue.fetch_logs('job', first[0]) == [second]
@@ -0,0 +1,220 @@
+import hashlib
+import html
+import io
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import requests
+from PIL import Image, features
+
+from parsers import AMAZON_IMAGE_URL_PATTERN, amazon_image_variant
+
+# Thumbnails live under static/ so Streamlit's static file serving (enabled
+# in .streamlit/config.toml) can hand them to the browser straight from disk
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+THUMBNAIL_DIR = os.path.join(STATIC_DIR, 'thumbnails')
+THUMBNAIL_URL_PREFIX = 'app/static/thumbnails'
+
+# Longest side, in pixels, of every thumbnail made per image. The grid cells
+# are roughly 240px (5 columns) to 270px (7 columns fullscreen) wide, so 320
+# covers them at 1x and 640 on high-density screens.
+THUMBNAIL_SIZES = (160, 320, 640)
+GRID_THUMBNAIL_SIZE = 320
+
+# How each grid lays out its images: the sizes hint telling the browser how
+# wide one tile is (columns across the iframe, less the gaps), the Amazon
+# widths offered in srcset until local thumbnails exist, and the width used
+# for the plain src. The fullscreen grid has more columns but fills the whole
+# screen, so its tiles come out a little larger.
+GRID_IMAGE_CONTEXTS = {
+    'grid': {'sizes': 'calc((100vw - 26px) / 5)', 'widths': (160, 240, 320, 480), 'src_width': 240},
+    'fullscreen': {'sizes': 'calc((100vw - 68px) / 7)', 'widths': (240, 320, 480, 640), 'src_width': 320}
+}
+
+THUMBNAIL_FORMAT = 'webp' if features.check('webp') else 'jpeg'
+THUMBNAIL_EXTENSION = 'webp' if THUMBNAIL_FORMAT == 'webp' else 'jpg'
+THUMBNAIL_QUALITY = 80
+
+DEFAULT_THUMBNAIL_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+DOWNLOAD_TIMEOUT = 15
+
+# A failed image is tried again after this long, doubling with every further
+# failure up to the cap, so a transient network error doesn't leave a
+# product without a thumbnail until the server restarts
+FAILURE_RETRY_SECONDS = 60
+MAX_FAILURE_RETRY_SECONDS = 3600
+
+
+# Function to get the file name stem shared by every thumbnail of an image
+def thumbnail_key(image_url):
+    return hashlib.sha1(image_url.encode('utf-8')).hexdigest()[:20]
+
+
+def thumbnail_filename(image_url, size):
+    return f'{thumbnail_key(image_url)}_{size}.{THUMBNAIL_EXTENSION}'
+
+
+# Function to download one image and write a thumbnail for every size. Runs
+# in a worker process, so it only takes and returns plain values. Returns
+# (image_url, error) with error None on success.
+def make_thumbnails(image_url, output_dir=THUMBNAIL_DIR, sizes=THUMBNAIL_SIZES):
+    try:
+        # Amazon can scale server-side, so there's no need to pull the
+        # full-size image just to shrink it
+        download_url = amazon_image_variant(image_url, max(sizes))
+        response = requests.get(download_url, timeout=DOWNLOAD_TIMEOUT, headers={'User-Agent': 'Mozilla/5.0'})
+        response.raise_for_status()
+        with Image.open(io.BytesIO(response.content)) as image:
+            image.load()
+            if image.mode not in ('RGB', 'L'):
+                # Amazon product shots sit on white, so flatten transparency onto white
+                background = Image.new('RGB', image.size, 'white')
+                rgba = image.convert('RGBA')
+                background.paste(rgba, mask=rgba.getchannel('A'))
+                image = background
+
+            os.makedirs(output_dir, exist_ok=True)
+            for size in sizes:
+                thumbnail = image.copy()
+                thumbnail.thumbnail((size, size), Image.LANCZOS)
+                path = os.path.join(output_dir, thumbnail_filename(image_url, size))
+                # Write to a temporary name first so the grid never serves a
+                # half-written file
+                temp_path = f'{path}.{os.getpid()}.tmp'
+                thumbnail.save(temp_path, THUMBNAIL_FORMAT, quality=THUMBNAIL_QUALITY)
+                os.replace(temp_path, path)
+        return image_url, None
+    except Exception as e:
+        return image_url, str(e)
+
+
+# Background pipeline that turns product image URLs into local thumbnails on
+# a process pool, so resizing never competes with the Streamlit script for a
+# core. Each URL is downloaded once; URLs that already have thumbnails on
+# disk or are in progress are skipped, and ones that failed are skipped until
+# their retry backoff has passed.
+class ThumbnailPipeline:
+    def __init__(self, output_dir=THUMBNAIL_DIR, max_workers=DEFAULT_THUMBNAIL_WORKERS, sizes=THUMBNAIL_SIZES):
+        self.output_dir = output_dir
+        self.max_workers = max_workers
+        self.sizes = tuple(sizes)
+        self._executor = None
+        self._pending = set()
+        self._ready = set()
+        # image_url -> (time of the last failure, failures so far, error)
+        self._failed = {}
+        self._lock = threading.Lock()
+        self.stats = {'submitted': 0, 'made': 0, 'failed': 0}
+
+    def _get_executor(self):
+        if self._executor is None:
+            # Streamlit is multi-threaded, so workers are spawned rather than
+            # forked from it
+            self._executor = ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context('spawn'))
+        return self._executor
+
+    def has_thumbnails(self, image_url):
+        if not isinstance(image_url, str) or not image_url:
+            return False
+        if image_url in self._ready:
+            return True
+        # The largest size is written last, so once it exists they all do
+        if os.path.exists(os.path.join(self.output_dir, thumbnail_filename(image_url, self.sizes[-1]))):
+            self._ready.add(image_url)
+            return True
+        return False
+
+    # Function to tell whether a failed URL is still waiting out its backoff
+    def _backing_off(self, image_url, now):
+        failure = self._failed.get(image_url)
+        if failure is None:
+            return False
+        failed_at, failures, _ = failure
+        backoff = min(FAILURE_RETRY_SECONDS * 2 ** (failures - 1), MAX_FAILURE_RETRY_SECONDS)
+        return now - failed_at < backoff
+
+    # Function to queue thumbnails for every URL that doesn't have them yet.
+    # Returns straight away with the number of URLs queued.
+    def ensure(self, image_urls):
+        queued = 0
+        now = time.time()
+        with self._lock:
+            for image_url in image_urls:
+                if not isinstance(image_url, str) or not image_url.startswith('http'):
+                    continue
+                if image_url in self._pending or self._backing_off(image_url, now) or self.has_thumbnails(image_url):
+                    continue
+                self._pending.add(image_url)
+                future = self._get_executor().submit(make_thumbnails, image_url, self.output_dir, self.sizes)
+                future.add_done_callback(lambda done, image_url=image_url: self._on_done(image_url, done))
+                queued += 1
+            self.stats['submitted'] += queued
+        return queued
+
+    def _on_done(self, image_url, future):
+        try:
+            _, error = future.result()
+        except Exception as e:
+            # The worker process itself died
+            error = str(e)
+        with self._lock:
+            self._pending.discard(image_url)
+            if error is None:
+                self._ready.add(image_url)
+                self._failed.pop(image_url, None)
+                self.stats['made'] += 1
+            else:
+                failures = self._failed[image_url][1] + 1 if image_url in self._failed else 1
+                self._failed[image_url] = (time.time(), failures, error)
+                self.stats['failed'] += 1
+
+    # Function to get the URL the grid should use for an image: its local
+    # thumbnail when one is ready, otherwise the original
+    def image_src(self, image_url, size=GRID_THUMBNAIL_SIZE):
+        if isinstance(image_url, str) and image_url and self.has_thumbnails(image_url):
+            return f'{THUMBNAIL_URL_PREFIX}/{thumbnail_filename(image_url, size)}'
+        return image_url
+
+    # Function to get the src, srcset and sizes attributes of a grid <img>
+    # for the given context ('grid' or 'fullscreen'), so the browser picks
+    # the smallest image that fills a tile. Local thumbnails are offered once
+    # they exist, otherwise Amazon's own scaled variants. URLs from anywhere
+    # else just get a src.
+    def image_attributes(self, image_url, context='grid'):
+        settings = GRID_IMAGE_CONTEXTS[context]
+        if not isinstance(image_url, str) or not image_url:
+            return 'src=""'
+
+        if self.has_thumbnails(image_url):
+            src = self.image_src(image_url)
+            candidates = [(f'{THUMBNAIL_URL_PREFIX}/{thumbnail_filename(image_url, size)}', size) for size in self.sizes]
+        elif AMAZON_IMAGE_URL_PATTERN.match(image_url):
+            src = amazon_image_variant(image_url, settings['src_width'])
+            candidates = [(amazon_image_variant(image_url, width), width) for width in settings['widths']]
+        else:
+            return f'src="{html.escape(image_url)}"'
+
+        srcset = ', '.join(f'{candidate} {width}w' for candidate, width in candidates)
+        return f'src="{html.escape(src)}" srcset="{html.escape(srcset)}" sizes="{settings["sizes"]}"'
+
+    def report(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['pending'] = len(self._pending)
+            stats['failing'] = len(self._failed)
+        return stats
+
+
+_default_thumbnail_pipeline = None
+_default_thumbnail_pipeline_lock = threading.Lock()
+
+# Function to get the process-wide thumbnail pipeline
+def get_default_thumbnail_pipeline():
+    global _default_thumbnail_pipeline
+    with _default_thumbnail_pipeline_lock:
+        if _default_thumbnail_pipeline is None:
+            _default_thumbnail_pipeline = ThumbnailPipeline()
+        return _default_thumbnail_pipeline
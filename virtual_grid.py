@@ -0,0 +1,132 @@
+import json
+
+# Rows kept in the DOM above and below the visible ones, so a fast scroll
+# doesn't show empty space before the next frame fills it in
+DEFAULT_BUFFER_ROWS = 4
+
+# The script keeps one absolutely positioned element per rendered row inside
+# a spacer as tall as the whole grid. On scroll it works out which rows are
+# in view (plus the buffer), drops the rows that left and builds the ones
+# that came in, so only a few hundred tiles exist however long the list is.
+# Rows that stay in view are left alone, so their images and fade-in aren't
+# restarted. Tiles are square, so row height follows from the grid width.
+VIRTUAL_GRID_SCRIPT = """
+<script>
+(function() {
+    const config = __CONFIG__;
+    const tiles = __TILES__;
+    const spacer = document.getElementById(config.id);
+    const scroller = document.querySelector(config.scroller);
+    const rowCount = Math.ceil(tiles.length / config.columns);
+    const rows = new Map();
+    let rowHeight = 0;
+    let scheduled = false;
+
+    function visibleRange() {
+        const offset = scroller.getBoundingClientRect().top - spacer.getBoundingClientRect().top;
+        const first = Math.floor(Math.max(0, offset) / rowHeight) - config.bufferRows;
+        const last = Math.floor((offset + scroller.clientHeight) / rowHeight) + config.bufferRows;
+        return [Math.max(0, first), Math.min(rowCount - 1, last)];
+    }
+
+    function buildRow(index) {
+        const row = document.createElement('div');
+        row.className = config.rowClass + ' virtual-grid-row';
+        row.style.top = (index * rowHeight) + 'px';
+        row.innerHTML = tiles.slice(index * config.columns, (index + 1) * config.columns).join('');
+        Array.from(row.children).forEach(function(tile, column) {
+            tile.style.setProperty('--item-index', column);
+        });
+        return row;
+    }
+
+    function render() {
+        scheduled = false;
+        if (!rowHeight) {
+            return;
+        }
+        const [first, last] = visibleRange();
+        rows.forEach(function(row, index) {
+            if (index < first || index > last) {
+                row.remove();
+                rows.delete(index);
+            }
+        });
+        const fragment = document.createDocumentFragment();
+        for (let index = first; index <= last; index++) {
+            if (!rows.has(index)) {
+                const row = buildRow(index);
+                rows.set(index, row);
+                fragment.appendChild(row);
+            }
+        }
+        spacer.appendChild(fragment);
+    }
+
+    function layout() {
+        const tileWidth = (spacer.clientWidth - config.gap * (config.columns - 1)) / config.columns;
+        rowHeight = tileWidth + config.gap;
+        spacer.style.height = Math.max(0, rowCount * rowHeight - config.gap) + 'px';
+        rows.forEach(function(row, index) {
+            row.style.top = (index * rowHeight) + 'px';
+        });
+        render();
+    }
+
+    function schedule() {
+        if (!scheduled) {
+            scheduled = true;
+            window.requestAnimationFrame(render);
+        }
+    }
+
+    scroller.addEventListener('scroll', schedule, {passive: true});
+    window.addEventListener('resize', layout);
+    layout();
+})();
+</script>
+"""
+
+
+# Function to render a windowed grid of square tiles. tiles is a list of
+# tile HTML strings in display order; row_class is the CSS class that lays
+# out one row (a CSS grid with the given column count and gap), and scroller
+# is a selector for the element that scrolls the grid. Returns the markup to
+# drop into the page where the grid goes.
+def render_virtual_grid(tiles, columns, gap, row_class, scroller, buffer_rows=DEFAULT_BUFFER_ROWS):
+    # Each grid lives in its own components.html iframe, so a fixed id is
+    # enough and keeps the markup identical across reruns
+    grid_id = 'virtual-grid'
+    config = {
+        'id': grid_id,
+        'columns': columns,
+        'gap': gap,
+        'rowClass': row_class,
+        'scroller': scroller,
+        'bufferRows': buffer_rows
+    }
+    script = VIRTUAL_GRID_SCRIPT.replace('__CONFIG__', _script_json(config)).replace('__TILES__', _script_json(tiles))
+    return f"""
+    <style>
+        #{grid_id} {{
+            position: relative;
+            width: 100%;
+        }}
+
+        #{grid_id} .virtual-grid-row {{
+            position: absolute;
+            left: 0;
+            right: 0;
+            margin: 0;
+            padding: 0;
+        }}
+    </style>
+    <div id="{grid_id}"></div>
+    {script}
+    """
+
+
+# Function to serialise a value for inline <script> use, so text in the
+# tiles can't close the script tag early
+def _script_json(value):
+    return json.dumps(value).replace('</', '<\\/')
@@ -0,0 +1,344 @@
+import json
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import uuid
+
+DEFAULT_WORK_QUEUE_PATH = os.environ.get('WORK_QUEUE_PATH', os.path.join('.cache', 'work_queue.sqlite3'))
+DEFAULT_SHARD_SIZE = 50
+DEFAULT_LEASE_SECONDS = 120
+MAX_WORKER_RESTARTS = 3
+
+SHARD_PENDING = 'pending'
+SHARD_LEASED = 'leased'
+SHARD_DONE = 'done'
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'shard_worker.py')
+WORKER_LOG_DIR_NAME = 'worker_logs'
+
+
+# Durable queue of ASIN shards shared by a coordinator and any number of
+# shard_worker.py processes. Workers lease a shard for lease_seconds and keep
+# renewing the lease while they work; a shard whose lease runs out (the
+# worker died or hung) goes back to the next worker that asks. Results are
+# written per ASIN as they finish, so a reassigned shard only refetches what
+# the dead worker hadn't written yet. Workers' log lines go through the queue
+# too, so the coordinator can show them in the job's log.
+class WorkQueue:
+    def __init__(self, path=DEFAULT_WORK_QUEUE_PATH):
+        self.path = path
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Several processes open this file at once, so writers wait for each
+        # other instead of failing straight away on a locked database.
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS shards (
+                shard_id TEXT PRIMARY KEY,
+                job_id TEXT NOT NULL,
+                asins TEXT NOT NULL,
+                status TEXT NOT NULL,
+                worker_id TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS shard_results (
+                result_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_id TEXT NOT NULL,
+                shard_id TEXT NOT NULL,
+                asin TEXT NOT NULL,
+                details TEXT NOT NULL
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS known_fields (
+                job_id TEXT NOT NULL,
+                asin TEXT NOT NULL,
+                fields TEXT NOT NULL,
+                PRIMARY KEY (job_id, asin)
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS worker_logs (
+                log_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_id TEXT NOT NULL,
+                level TEXT NOT NULL,
+                message TEXT NOT NULL
+            )
+        """)
+        self._conn.execute('CREATE INDEX IF NOT EXISTS shards_status ON shards (status, lease_expires)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS shard_results_job ON shard_results (job_id, result_id)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS worker_logs_job ON worker_logs (job_id, log_id)')
+
+    # Function to split a job's ASINs into shards and queue them, replacing
+    # whatever an earlier run of the same job left behind. known_fields maps
+    # an ASIN to the fields already known for it, which workers then don't
+    # look for again.
+    def enqueue_job(self, job_id, asins, shard_size=DEFAULT_SHARD_SIZE, known_fields=None):
+        asins = [str(asin) for asin in asins]
+        shard_size = max(1, int(shard_size))
+        rows = [
+            (f'{job_id}-{index // shard_size}', job_id, json.dumps(asins[index:index + shard_size]), SHARD_PENDING)
+            for index in range(0, len(asins), shard_size)
+        ]
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            self._conn.execute('DELETE FROM shards WHERE job_id = ?', (job_id,))
+            self._conn.execute('DELETE FROM shard_results WHERE job_id = ?', (job_id,))
+            self._conn.execute('DELETE FROM known_fields WHERE job_id = ?', (job_id,))
+            self._conn.execute('DELETE FROM worker_logs WHERE job_id = ?', (job_id,))
+            self._conn.executemany('INSERT INTO shards (shard_id, job_id, asins, status) VALUES (?, ?, ?, ?)', rows)
+            self._conn.executemany(
+                'INSERT INTO known_fields (job_id, asin, fields) VALUES (?, ?, ?)',
+                [(job_id, str(asin), json.dumps(fields)) for asin, fields in (known_fields or {}).items()]
+            )
+            self._conn.execute('COMMIT')
+        return len(rows)
+
+    # Function to lease the next pending or expired shard. Returns
+    # (shard_id, job_id, asins still without a result) or None when there is
+    # nothing to do. job_id limits the lease to one job's shards.
+    def lease_shard(self, worker_id, lease_seconds=DEFAULT_LEASE_SECONDS, job_id=None, now=None):
+        now = time.time() if now is None else now
+        query = 'SELECT shard_id, job_id, asins FROM shards WHERE (status = ? OR (status = ? AND lease_expires < ?))'
+        params = [SHARD_PENDING, SHARD_LEASED, now]
+        if job_id is not None:
+            query += ' AND job_id = ?'
+            params.append(job_id)
+        query += ' ORDER BY shard_id LIMIT 1'
+
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = self._conn.execute(query, params).fetchone()
+                if row is None:
+                    return None
+                shard_id, shard_job_id, asins = row
+                self._conn.execute(
+                    'UPDATE shards SET status = ?, worker_id = ?, lease_expires = ?, attempts = attempts + 1 WHERE shard_id = ?',
+                    (SHARD_LEASED, worker_id, now + lease_seconds, shard_id)
+                )
+                done = {asin for (asin,) in self._conn.execute(
+                    'SELECT asin FROM shard_results WHERE shard_id = ?', (shard_id,)
+                )}
+            finally:
+                self._conn.execute('COMMIT')
+
+        return shard_id, shard_job_id, [asin for asin in json.loads(asins) if asin not in done]
+
+    # Function to write finished ASINs for a leased shard and renew its lease.
+    # Returns False when the lease has been lost to another worker, in which
+    # case the results are dropped and the caller should stop working on it.
+    def record_results(self, shard_id, worker_id, results, lease_seconds=DEFAULT_LEASE_SECONDS, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = self._conn.execute('SELECT job_id, worker_id FROM shards WHERE shard_id = ?', (shard_id,)).fetchone()
+                if row is None or row[1] != worker_id:
+                    return False
+                self._conn.executemany(
+                    'INSERT INTO shard_results (job_id, shard_id, asin, details) VALUES (?, ?, ?, ?)',
+                    [(row[0], shard_id, str(asin), json.dumps(details)) for asin, details in results]
+                )
+                self._conn.execute('UPDATE shards SET lease_expires = ? WHERE shard_id = ?', (now + lease_seconds, shard_id))
+            finally:
+                self._conn.execute('COMMIT')
+        return True
+
+    # Function to get the known fields queued with a job, for the given ASINs
+    def get_known_fields(self, job_id, asins):
+        asins = {str(asin) for asin in asins}
+        with self._lock:
+            rows = self._conn.execute('SELECT asin, fields FROM known_fields WHERE job_id = ?', (job_id,)).fetchall()
+        return {asin: json.loads(fields) for asin, fields in rows if asin in asins}
+
+    def complete_shard(self, shard_id, worker_id):
+        with self._lock:
+            self._conn.execute(
+                'UPDATE shards SET status = ?, lease_expires = NULL WHERE shard_id = ? AND worker_id = ?',
+                (SHARD_DONE, shard_id, worker_id)
+            )
+
+    # Function to read results written since after_id. Returns a list of
+    # (result_id, asin, product_details) in the order they were written.
+    def fetch_results(self, job_id, after_id=0):
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT result_id, asin, details FROM shard_results WHERE job_id = ? AND result_id > ? ORDER BY result_id',
+                (job_id, after_id)
+            ).fetchall()
+        return [(result_id, asin, json.loads(details)) for result_id, asin, details in rows]
+
+    # Function to write a worker's (level, message) log lines for a job
+    def record_logs(self, job_id, lines):
+        if not lines:
+            return
+        with self._lock:
+            self._conn.executemany(
+                'INSERT INTO worker_logs (job_id, level, message) VALUES (?, ?, ?)',
+                [(job_id, level, message) for level, message in lines]
+            )
+
+    # Function to read log lines written since after_id. Returns a list of
+    # (log_id, level, message) in the order they were written.
+    def fetch_logs(self, job_id, after_id=0):
+        with self._lock:
+            return self._conn.execute(
+                'SELECT log_id, level, message FROM worker_logs WHERE job_id = ? AND log_id > ? ORDER BY log_id',
+                (job_id, after_id)
+            ).fetchall()
+
+    # Function to count a job's shards by status
+    def shard_counts(self, job_id):
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT status, COUNT(*) FROM shards WHERE job_id = ? GROUP BY status',
+                (job_id,)
+            ).fetchall()
+        counts = {SHARD_PENDING: 0, SHARD_LEASED: 0, SHARD_DONE: 0}
+        counts.update(dict(rows))
+        return counts
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# Function to start a local shard_worker.py process for a job. rate and
+# max_rate, if given, are the worker's own starting and highest request rate.
+# The worker's output, including the traceback if it crashes, goes to
+# log_path when one is given.
+def spawn_worker(queue_path, job_id, concurrency, lease_seconds=DEFAULT_LEASE_SECONDS, rate=None, max_rate=None, log_path=None):
+    command = [
+        sys.executable, WORKER_SCRIPT,
+        '--queue', queue_path,
+        '--job-id', job_id,
+        '--concurrency', str(concurrency),
+        '--lease-seconds', str(lease_seconds)
+    ]
+    if rate is not None:
+        command += ['--rate', str(rate)]
+    if max_rate is not None:
+        command += ['--max-rate', str(max_rate)]
+    if log_path is None:
+        return subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    os.makedirs(os.path.dirname(log_path), exist_ok=True)
+    with open(log_path, 'ab') as log_file:
+        return subprocess.Popen(command, stdout=log_file, stderr=subprocess.STDOUT)
+
+
+# Function to read the last line a worker wrote to its log file
+def last_log_line(log_path):
+    try:
+        with open(log_path, encoding='utf-8', errors='replace') as log_file:
+            lines = [line.strip() for line in log_file if line.strip()]
+    except OSError:
+        return None
+    return lines[-1] if lines else None
+
+
+# Function to fetch ASINs through the work queue instead of in this process.
+# Shards the ASINs, starts workers local processes (more can be pointed at
+# the same queue file from elsewhere) and yields finished
+# (processing_id, asin, product_details) tuples in the same shape and rhythm
+# as fetcher.iter_product_details, so callers can use either. The workers'
+# log lines are forwarded to log_queue as they come in, and each worker's
+# output is kept in a log file next to the queue.
+# Every worker paces itself with its own rate limiter, so rate and max_rate
+# (the request rate budget of the whole job) are split evenly between them
+# to keep the workers together within the budget.
+def iter_sharded_product_details(job_id, asins, log_queue, workers=2, concurrency=8, shard_size=DEFAULT_SHARD_SIZE,
+                                 poll_interval=0.5, queue_path=DEFAULT_WORK_QUEUE_PATH, lease_seconds=DEFAULT_LEASE_SECONDS, known_fields=None,
+                                 rate=None, max_rate=None):
+    asins = list(asins)
+    by_key = {str(asin): asin for asin in asins}
+    work_queue = WorkQueue(queue_path)
+    shard_count = work_queue.enqueue_job(job_id, asins, shard_size, known_fields)
+    worker_concurrency = max(1, int(concurrency) // max(1, workers))
+    worker_rate = rate / max(1, workers) if rate is not None else None
+    worker_max_rate = max_rate / max(1, workers) if max_rate is not None else None
+    log_queue.put(('info', f'Queued {len(asins)} ASINs as {shard_count} shards for {workers} worker processes ({worker_concurrency} requests each'
+                   + (f', starting at {worker_rate:.2f} req/s each' if worker_rate is not None else '') + ')'))
+
+    log_dir = os.path.join(os.path.dirname(queue_path) or '.', WORKER_LOG_DIR_NAME)
+    log_paths = []
+
+    def start_worker():
+        log_paths.append(os.path.join(log_dir, f'{job_id}-worker{len(log_paths) + 1}.log'))
+        return spawn_worker(queue_path, job_id, worker_concurrency, lease_seconds, worker_rate, worker_max_rate, log_paths[-1])
+
+    processes = [start_worker() for _ in range(workers)]
+    process_logs = list(log_paths)
+    restarts = 0
+    seen = set()
+    after_id = 0
+    log_after_id = 0
+
+    try:
+        while True:
+            # Checked before reading results so that anything a worker wrote
+            # just before exiting is still picked up below
+            alive = any(process.poll() is None for process in processes)
+
+            for log_id, level, message in work_queue.fetch_logs(job_id, log_after_id):
+                log_after_id = log_id
+                log_queue.put((level, message))
+
+            completed = []
+            for result_id, asin, product_details in work_queue.fetch_results(job_id, after_id):
+                after_id = result_id
+                if asin in seen or asin not in by_key:
+                    continue
+                seen.add(asin)
+                completed.append((len(seen), by_key[asin], product_details))
+            yield completed
+
+            counts = work_queue.shard_counts(job_id)
+            if counts[SHARD_DONE] == shard_count and len(seen) >= len(by_key):
+                break
+
+            # A worker that crashed leaves its shard leased until the lease
+            # runs out; replace it so someone is around to pick the shard up.
+            for index, process in enumerate(processes):
+                if process.poll() is None or process.returncode == 0:
+                    continue
+                if restarts >= MAX_WORKER_RESTARTS * workers:
+                    continue
+                restarts += 1
+                alive = True
+                last_line = last_log_line(process_logs[index])
+                log_queue.put(('warning', f'Shard worker exited with code {process.returncode}'
+                               + (f' ({last_line})' if last_line else '') + f', see {process_logs[index]}; starting a replacement'))
+                processes[index] = start_worker()
+                process_logs[index] = log_paths[-1]
+
+            if not alive:
+                raise RuntimeError(f'All shard workers exited with {shard_count - counts[SHARD_DONE]} shards unfinished')
+
+            time.sleep(poll_interval)
+
+        # Whatever the workers logged along with their last results
+        for _, level, message in work_queue.fetch_logs(job_id, log_after_id):
+            log_queue.put((level, message))
+    finally:
+        for process in processes:
+            if process.poll() is None:
+                process.terminate()
+        work_queue.close()
+
+
+# Function to make a worker ID that is unique across hosts
+def make_worker_id():
+    return f'{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}'